@@ -0,0 +1,162 @@
+import math
+import random
+import time
+from array import array
+from collections import OrderedDict
+from hashlib import blake2b
+
+
+class ActivityTracker:
+    """
+    群活跃度计数器，由 on_notice 收到的每条群消息驱动，每条消息 O(1)
+
+    每个群占一个槽位，所有数据按槽位存放在连续数组中：
+    - last:  最后一条消息的时间
+    - score: 指数衰减的消息计数（半衰期 half_life 秒），score / tau 即消息速率
+    - hll:   发言人去重计数的 HyperLogLog 寄存器，每群 2^P 字节
+    另按 LRU 记录最近发言用户的最后发言时间
+
+    槽位满了需要扩容前，先回收沉寂超过 idle_ttl 秒且分数已衰减到可忽略的群，
+    回收的槽位由最后一个槽位搬过来填补，数组保持紧凑
+    """
+
+    P = 7
+    M = 1 << P
+    _ALPHA = 0.7213 / (1 + 1.079 / M)
+    # 衰减后低于该值的分数视为 0
+    _NEGLIGIBLE = 0.01
+
+    def __init__(
+        self,
+        half_life: float = 3600.0,
+        capacity: int = 256,
+        users: int = 4096,
+        idle_ttl: float = 7 * 86400.0,
+    ):
+        self.tau = half_life / math.log(2)
+        self.idle_ttl = idle_ttl
+        # 最近发言的用户 -> 最后发言时间，只保留最近 users 个
+        self._users: OrderedDict[str, float] = OrderedDict()
+        self._user_cap = users
+        self._slots: dict[str, int] = {}
+        self._ids: list[str] = []
+        self._last = array("d", bytes(8 * capacity))
+        self._score = array("d", bytes(8 * capacity))
+        self._hll = bytearray(self.M * capacity)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def group_ids(self) -> list[str]:
+        return list(self._ids)
+
+    def _slot(self, group_id: str, now: float) -> int:
+        slot = self._slots.get(group_id)
+        if slot is None:
+            if len(self._ids) >= len(self._last):
+                self.prune(now)
+            slot = len(self._ids)
+            if slot >= len(self._last):
+                grow = len(self._last)
+                self._last.extend(array("d", bytes(8 * grow)))
+                self._score.extend(array("d", bytes(8 * grow)))
+                self._hll.extend(bytes(self.M * grow))
+            self._slots[group_id] = slot
+            self._ids.append(group_id)
+        return slot
+
+    # -------------------------
+    # 更新
+    # -------------------------
+    def observe(self, group_id: str, user_id: str, ts: float | None = None) -> None:
+        """记录一条群消息"""
+        now = ts or time.time()
+        slot = self._slot(group_id, now)
+
+        last = self._last[slot]
+        decay = math.exp(-(now - last) / self.tau) if last else 0.0
+        self._score[slot] = self._score[slot] * decay + 1.0
+        self._last[slot] = now
+
+        users = self._users
+        users[user_id] = now
+        users.move_to_end(user_id)
+        if len(users) > self._user_cap:
+            users.popitem(last=False)
+
+        h = int.from_bytes(blake2b(user_id.encode(), digest_size=8).digest(), "big")
+        reg = h & (self.M - 1)
+        w = h >> self.P
+        rank = (64 - self.P) - w.bit_length() + 1
+        pos = slot * self.M + reg
+        if rank > self._hll[pos]:
+            self._hll[pos] = rank
+
+    def prune(self, now: float | None = None) -> int:
+        """回收沉寂的群的槽位，返回回收数量"""
+        now = now or time.time()
+        stale = [
+            gid
+            for gid, slot in self._slots.items()
+            if now - self._last[slot] >= self.idle_ttl
+            and self._score[slot] * math.exp(-(now - self._last[slot]) / self.tau)
+            < self._NEGLIGIBLE
+        ]
+        for gid in stale:
+            self._evict(gid)
+        return len(stale)
+
+    def _evict(self, group_id: str) -> None:
+        slot = self._slots.pop(group_id)
+        tail = len(self._ids) - 1
+        if slot != tail:
+            # 最后一个槽位搬到空出的位置
+            moved = self._ids[tail]
+            self._ids[slot] = moved
+            self._slots[moved] = slot
+            self._last[slot] = self._last[tail]
+            self._score[slot] = self._score[tail]
+            m = self.M
+            self._hll[slot * m : (slot + 1) * m] = self._hll[tail * m : (tail + 1) * m]
+        self._ids.pop()
+        self._last[tail] = 0.0
+        self._score[tail] = 0.0
+        self._hll[tail * self.M : (tail + 1) * self.M] = bytes(self.M)
+
+    # -------------------------
+    # 查询
+    # -------------------------
+    def last_seen(self, group_id: str) -> float:
+        slot = self._slots.get(group_id)
+        return self._last[slot] if slot is not None else 0.0
+
+    def user_seen(self, user_id: str) -> float:
+        """用户在任意群最后一次发言的时间，未记录为 0"""
+        return self._users.get(user_id, 0.0)
+
+    def rate(self, group_id: str, now: float | None = None) -> float:
+        """当前消息速率（条/小时）"""
+        slot = self._slots.get(group_id)
+        if slot is None:
+            return 0.0
+        now = now or time.time()
+        decay = math.exp(-(now - self._last[slot]) / self.tau)
+        return self._score[slot] * decay / self.tau * 3600
+
+    def senders(self, group_id: str) -> int:
+        """发言人数估计（HyperLogLog）"""
+        slot = self._slots.get(group_id)
+        if slot is None:
+            return 0
+        regs = self._hll[slot * self.M : (slot + 1) * self.M]
+        est = self._ALPHA * self.M * self.M / sum(2.0**-r for r in regs)
+        zeros = regs.count(0)
+        if est <= 2.5 * self.M and zeros:
+            est = self.M * math.log(self.M / zeros)
+        return round(est)
+
+    def weighted_choice(self, group_ids: list[str]) -> str:
+        """按活跃度加权随机选一个群，没发过言的群保留少量权重"""
+        now = time.time()
+        weights = [self.rate(gid, now) + 0.1 for gid in group_ids]
+        return random.choices(group_ids, weights=weights, k=1)[0]
@@ -0,0 +1,367 @@
+import asyncio
+import json
+from collections.abc import Callable, Iterable
+from dataclasses import replace
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Union
+
+from aiocqhttp import CQHttp
+
+from astrbot.api import logger
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from .activity import ActivityTracker
+from .buffer import MessageBuffer
+from .config import ListSnapshot, PluginConfig
+from .journal import Journal
+from .resilience import Fetched, ResilientCaller
+from .roster import FriendRoster, GroupRoster
+from .store import SHARED_SCOPE, SqliteStore, StoreLists
+from .tracing import Tracer
+
+if TYPE_CHECKING:
+    # request 包依赖本模块，运行时延迟导入
+    from .request.model import BaseRequest
+
+Lists = Union[PluginConfig, "BotLists", StoreLists]
+
+# 全局名单改动攒多久再写回配置（秒）：批量拉黑等连续改动只保存一次
+MIRROR_DELAY = 2.0
+
+
+class BoundClient:
+    """
+    绑定了 self_id 的 CQHttp 代理
+
+    同一个 aiocqhttp 实例下挂多个账号时，调用必须带上 self_id 才会路由到
+    对应账号的连接，否则会落到任意一个在线账号上。
+    用法与 CQHttp 一致：client.get_group_list() / client.call_action(...)
+    """
+
+    __slots__ = ("_client", "self_id", "calls")
+
+    def __init__(self, client: CQHttp, self_id: int, calls: ResilientCaller):
+        self._client = client
+        self.self_id = self_id
+        self.calls = calls
+
+    @property
+    def api(self) -> "BoundClient":
+        return self
+
+    @property
+    def raw(self) -> CQHttp:
+        return self._client
+
+    async def call_action(self, action: str, **params) -> Any:
+        params.setdefault("self_id", self.self_id)
+        return await self.calls.call(self._client.call_action, action, params)
+
+    async def fetch(self, action: str, **params) -> Fetched:
+        """只读查询：失败时不抛异常，退回缓存值并标记 stale"""
+        params.setdefault("self_id", self.self_id)
+        return await self.calls.fetch(self._client.call_action, action, params)
+
+    def __getattr__(self, action: str):
+        if action.startswith("_"):
+            raise AttributeError(action)
+        return partial(self.call_action, action)
+
+
+class BotLists:
+    """
+    单个账号独享的名单（黑名单 / 审批员），持久化到插件数据目录
+
+    接口与 PluginConfig 的名单方法一致，两者可互换
+    """
+
+    _KEYS = ("group_blacklist", "user_blacklist", "manage_users")
+
+    def __init__(self, path: Path, seed: PluginConfig):
+        self.path = path
+        self.seed = seed
+        data: dict[str, list[str]] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text("utf-8"))
+            except Exception as e:
+                logger.error(f"读取账号名单失败({path}): {e}")
+        # 首次使用时以全局名单为初始值
+        self.group_blacklist: list[str] = data.get(
+            "group_blacklist", list(seed.group_blacklist)
+        )
+        self.user_blacklist: list[str] = data.get(
+            "user_blacklist", list(seed.user_blacklist)
+        )
+        self.manage_users: list[str] = data.get(
+            "manage_users", list(seed.manage_users)
+        )
+        if seed.admin_id and seed.admin_id not in self.manage_users:
+            self.manage_users.append(seed.admin_id)
+        # 互斥成员始终全局共享
+        self.mutual_blacklist = seed.mutual_blacklist
+        self._lists = ListSnapshot(
+            frozenset(self.group_blacklist),
+            frozenset(self.user_blacklist),
+            frozenset(self.manage_users),
+        )
+
+    def snapshot(self) -> ListSnapshot:
+        # 互斥成员取全局快照里的同一个 frozenset，不复制
+        mutual = self.seed.snapshot().mutual_blacklist
+        if self._lists.mutual_blacklist is not mutual:
+            self._lists = replace(self._lists, mutual_blacklist=mutual)
+        return self._lists
+
+    def save_config(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {key: getattr(self, key) for key in self._KEYS}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), "utf-8")
+        tmp.replace(self.path)
+
+    def _publish(self, key: str) -> None:
+        self._lists = replace(self._lists, **{key: frozenset(getattr(self, key))})
+        self.save_config()
+
+    def _add(self, key: str, value: str | int, label: str) -> None:
+        v = str(value)
+        items: list[str] = getattr(self, key)
+        if v not in getattr(self._lists, key):
+            items.append(v)
+            self._publish(key)
+            logger.info(f"[{self.path.stem}] {v} 已加入{label}")
+
+    def _add_many(self, key: str, values: Iterable[str | int], label: str) -> int:
+        added = PluginConfig._extend(getattr(self, key), values)
+        if added:
+            self._publish(key)
+            logger.info(f"[{self.path.stem}] {added} 个 ID 已加入{label}")
+        return added
+
+    def _remove(self, key: str, value: str | int, label: str) -> None:
+        v = str(value)
+        items: list[str] = getattr(self, key)
+        if v in getattr(self._lists, key):
+            items.remove(v)
+            self._publish(key)
+            logger.info(f"[{self.path.stem}] {v} 已从{label}移除")
+
+    def is_black_group(self, group_id: str | int) -> bool:
+        return self._lists.is_black_group(group_id)
+
+    def add_black_group(self, group_id: str | int) -> None:
+        self._add("group_blacklist", group_id, "群聊黑名单")
+
+    def add_black_groups(self, group_ids: Iterable[str | int]) -> int:
+        return self._add_many("group_blacklist", group_ids, "群聊黑名单")
+
+    def remove_black_group(self, group_id: str | int) -> None:
+        self._remove("group_blacklist", group_id, "群聊黑名单")
+
+    def is_block_user(self, user_id: str | int) -> bool:
+        return self._lists.is_block_user(user_id)
+
+    def add_block_user(self, user_id: str | int) -> None:
+        self._add("user_blacklist", user_id, "用户黑名单")
+
+    def add_block_users(self, user_ids: Iterable[str | int]) -> int:
+        return self._add_many("user_blacklist", user_ids, "用户黑名单")
+
+    def remove_block_user(self, user_id: str | int) -> None:
+        self._remove("user_blacklist", user_id, "用户黑名单")
+
+    def is_manage_user(self, user_id: str | int) -> bool:
+        return self._lists.is_manage_user(user_id)
+
+    def add_manage_user(self, user_id: str | int) -> None:
+        self._add("manage_users", user_id, "审批员")
+
+    def remove_manage_user(self, user_id: str | int) -> None:
+        self._remove("manage_users", user_id, "审批员")
+
+    def is_mutual(self, user_id: str | int) -> bool:
+        return self.seed.is_mutual(user_id)
+
+
+class BotContext:
+    """单个账号的运行时状态：客户端、名单、列表缓存、待审批申请"""
+
+    def __init__(
+        self,
+        self_id: str,
+        client: CQHttp,
+        config: PluginConfig,
+        lists: Lists,
+        journal: Journal,
+        store: SqliteStore | None = None,
+    ):
+        self.self_id = self_id
+        self.cfg = config
+        # 重试、熔断和缓存状态跨重连保留
+        self.calls = ResilientCaller()
+        self.client = BoundClient(client, int(self_id), self.calls)
+        self.lists = lists
+        self.journal = journal
+        self.store = store
+        self.groups = GroupRoster(ttl=config.roster.cache_ttl)
+        self.friends = FriendRoster(ttl=config.roster.cache_ttl)
+        self.activity = ActivityTracker()
+        self.messages: MessageBuffer | None = None
+        if config.check.buffer_size > 0:
+            self.messages = MessageBuffer(
+                config.check.buffer_size, config.check.buffer_budget * 1024 * 1024
+            )
+        # 巡检状态：成员有变动待复查的群、上次复查时的人数、当前违规、互斥名单、
+        # 上一轮群列表是否骤减（连续两轮骤减才采信）
+        self.dirty_groups: set[str] = set()
+        self.sweep_counts: dict[str, int] = {}
+        self.sweep_violations: dict[str, str] = {}
+        self.sweep_mutual: frozenset[str] = frozenset()
+        self.sweep_shrunk = False
+        # 缓存预热进度（见 warmup.py），空串表示未预热
+        self.warmup = ""
+        # flag -> 申请对象，等待审批员处理
+        self.pending: dict[str, "BaseRequest"] = {}
+        if store:
+            from .request.model import BaseRequest
+
+            for flag, _, payload in store.load_pending(self_id):
+                if req := BaseRequest.from_display_text(payload):
+                    self.pending[flag] = req
+
+    def add_pending(self, req: "BaseRequest") -> None:
+        flag = getattr(req, "flag", "")
+        self.pending[flag] = req
+        if self.store:
+            kind = type(req).__name__
+            self.store.put_pending(self.self_id, flag, kind, req.to_display_text())
+
+    def pop_pending(self, flag: str) -> "BaseRequest | None":
+        req = self.pending.pop(flag, None)
+        if req and self.store:
+            self.store.pop_pending(self.self_id, flag)
+        return req
+
+    def record(
+        self,
+        action: str,
+        target: str | int,
+        *,
+        operator: str | int = "",
+        reason: str = "",
+        outcome: str = "成功",
+    ) -> None:
+        """写一条关系操作日志"""
+        self.journal.record(
+            self.self_id,
+            action,
+            target,
+            operator=operator,
+            reason=reason,
+            outcome=outcome,
+        )
+
+    def bind(self, client: CQHttp) -> None:
+        """适配器重连后 CQHttp 实例可能变化"""
+        if self.client.raw is not client:
+            self.client = BoundClient(client, int(self.self_id), self.calls)
+
+
+class BotRegistry:
+    """按 self_id 索引的账号状态表，O(1) 取得当前事件所属账号"""
+
+    def __init__(self, config: PluginConfig, data_dir: Path):
+        self.cfg = config
+        self.data_dir = data_dir
+        self._bots: dict[str, BotContext] = {}
+        self._shared: Lists | None = None
+        self.journal = Journal(data_dir / "journal")
+        self.tracer = Tracer(data_dir / "traces", config.trace_rate)
+        # 新账号上下文创建后的回调（用于后台预热）
+        self.on_create: Callable[[BotContext], None] | None = None
+        # 待写回配置的全局名单，表名 -> 最新内容
+        self._dirty: dict[str, frozenset[str]] = {}
+        self._mirror_timer: asyncio.TimerHandle | None = None
+
+        self.store: SqliteStore | None = None
+        if config.storage == "sqlite":
+            self.store = SqliteStore(data_dir / "relationship.db")
+            self.store.sync_from_config(config)
+
+    def close(self) -> None:
+        self._flush_mirror()
+        self.journal.close()
+        self.tracer.close()
+        if self.store:
+            self.store.close()
+
+    def __iter__(self):
+        return iter(self._bots.values())
+
+    def __len__(self) -> int:
+        return len(self._bots)
+
+    def _make_lists(self, self_id: str) -> Lists:
+        if self.store:
+            if not self.cfg.share_lists:
+                self.store.seed_scope(self_id, SHARED_SCOPE)
+                return StoreLists(
+                    self.store, self_id, self.cfg.admin_id, on_change=self._mirror
+                )
+            if self._shared is None:
+                self._shared = StoreLists(
+                    self.store, SHARED_SCOPE, self.cfg.admin_id, on_change=self._mirror
+                )
+            return self._shared
+        if self.cfg.share_lists:
+            return self.cfg
+        return BotLists(self.data_dir / "bots" / f"{self_id}.json", self.cfg)
+
+    def _mirror(self, table: str, values: frozenset[str]) -> None:
+        """全局名单变化后写回配置，WebUI 里看到的与实际生效的一致"""
+        self._dirty[table] = values
+        if self._mirror_timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环（加载阶段）时直接写回
+            self._flush_mirror()
+            return
+        self._mirror_timer = loop.call_later(MIRROR_DELAY, self._flush_mirror)
+
+    def _flush_mirror(self) -> None:
+        """把攒下的名单改动写回配置，只保存一次"""
+        if self._mirror_timer is not None:
+            self._mirror_timer.cancel()
+            self._mirror_timer = None
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        for table, values in dirty.items():
+            self.cfg.replace_list(table, values, save=False)
+            if self.store:
+                self.store.mark_synced(table, values)
+        self.cfg.save_config()
+
+    def get(self, event: AiocqhttpMessageEvent) -> BotContext:
+        return self.get_by_id(str(event.get_self_id()), event.bot)
+
+    def get_by_id(self, self_id: str, client: CQHttp) -> BotContext:
+        bot = self._bots.get(self_id)
+        if bot is None:
+            lists = self._make_lists(self_id)
+            bot = BotContext(
+                self_id, client, self.cfg, lists, self.journal, self.store
+            )
+            self._bots[self_id] = bot
+            logger.debug(f"已创建账号上下文: {self_id}")
+            if self.on_create:
+                self.on_create(bot)
+        else:
+            bot.bind(client)
+        return bot
@@ -0,0 +1,83 @@
+import json
+from collections import OrderedDict, deque
+from typing import Any
+
+
+class MessageBuffer:
+    """
+    按群保存最近 N 条消息的环形缓冲
+
+    - 每条消息压成一段紧凑的 JSON bytes：[user_id, nickname, message]
+    - 所有群共享一个内存预算，超出时按最近最少写入（LRU）整群淘汰
+    - 取出时还原成 get_group_msg_history 的消息结构，可直接构造转发节点
+    """
+
+    def __init__(self, per_group: int, budget_bytes: int):
+        self.per_group = max(per_group, 1)
+        self.budget = max(budget_bytes, 0)
+        self._groups: OrderedDict[str, deque[bytes]] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._total = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def push(self, group_id: str, raw: dict[str, Any]) -> None:
+        sender = raw.get("sender") or {}
+        data = json.dumps(
+            [
+                raw.get("user_id") or sender.get("user_id", 0),
+                sender.get("card") or sender.get("nickname", ""),
+                raw.get("message", ""),
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode()
+
+        ring = self._groups.get(group_id)
+        if ring is None:
+            ring = self._groups[group_id] = deque(maxlen=self.per_group)
+            self._sizes[group_id] = 0
+        else:
+            self._groups.move_to_end(group_id)
+
+        if len(ring) == ring.maxlen:
+            dropped = len(ring[0])
+            self._sizes[group_id] -= dropped
+            self._total -= dropped
+        ring.append(data)
+        self._sizes[group_id] += len(data)
+        self._total += len(data)
+
+        while self._total > self.budget and len(self._groups) > 1:
+            self._evict()
+
+    def _evict(self) -> None:
+        gid, _ = self._groups.popitem(last=False)
+        self._total -= self._sizes.pop(gid)
+
+    def recent(self, group_id: str, count: int) -> list[dict[str, Any]]:
+        """最近 count 条消息（从旧到新），不足时返回已有的全部"""
+        ring = self._groups.get(group_id)
+        if not ring:
+            return []
+        items = list(ring)[-count:] if count > 0 else list(ring)
+        messages = []
+        for data in items:
+            user_id, nickname, message = json.loads(data)
+            messages.append(
+                {
+                    "sender": {"user_id": user_id, "nickname": nickname},
+                    "message": message,
+                }
+            )
+        return messages
+
+    def covers(self, group_id: str, count: int) -> bool:
+        """缓冲能否满足 count 条的请求（缓冲已满也视为满足）"""
+        ring = self._groups.get(group_id)
+        return bool(ring) and len(ring) >= min(count, self.per_group)
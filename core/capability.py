@@ -0,0 +1,91 @@
+import importlib
+import importlib.util
+import sys
+import time
+from typing import Any
+
+from astrbot.api import logger
+
+
+class Capabilities:
+    """
+    可选模块注册表
+
+    - 插件加载时探测一次，解析到的对象或「不可用」都缓存下来，
+      之后调用方只做一次 dict 取值，不再反复触发导入
+    - 补装模块后通过 reload() 重新探测
+    - afdian_verify 的结果按申请人缓存 ttl 秒
+    """
+
+    # 名称 -> (相对 core 包的模块路径, 属性名)
+    OPTIONAL = {
+        "afdian": ("..afdian", "afdian_verify"),
+        "expansion": (".expansion", "ExpansionHandle"),
+    }
+
+    def __init__(self, afdian_ttl: float = 600.0, afdian_capacity: int = 1024):
+        self.afdian_ttl = afdian_ttl
+        self.afdian_capacity = afdian_capacity
+        self._resolved: dict[str, Any] = {}
+        self._afdian_cache: dict[str, tuple[float, bool]] = {}
+        self.reload()
+
+    def reload(self) -> dict[str, bool]:
+        """重新探测全部可选模块，返回 名称 -> 是否可用"""
+        importlib.invalidate_caches()
+        self._afdian_cache.clear()
+        for name, (path, attr) in self.OPTIONAL.items():
+            self._resolved[name] = self._probe(path, attr)
+        status = {name: obj is not None for name, obj in self._resolved.items()}
+        logger.debug(f"可选模块：{status}")
+        return status
+
+    @staticmethod
+    def _probe(path: str, attr: str) -> Any:
+        fullname = importlib.util.resolve_name(path, __package__)
+        try:
+            if fullname in sys.modules:
+                module = importlib.reload(sys.modules[fullname])
+            else:
+                module = importlib.import_module(fullname)
+            return getattr(module, attr)
+        except (ImportError, AttributeError):
+            return None
+        except Exception as e:
+            logger.warning(f"加载可选模块 {fullname} 失败: {e}")
+            return None
+
+    def get(self, name: str) -> Any:
+        """已解析的对象，不可用时为 None"""
+        return self._resolved.get(name)
+
+    def available(self, name: str) -> bool:
+        return self._resolved.get(name) is not None
+
+    # -------------------------
+    # afdian
+    # -------------------------
+    def afdian_verify(self, requester_id: str) -> bool:
+        verify = self._resolved.get("afdian")
+        if verify is None:
+            return False
+        now = time.monotonic()
+        hit = self._afdian_cache.get(requester_id)
+        if hit and now - hit[0] < self.afdian_ttl:
+            return hit[1]
+        try:
+            ok = bool(verify(remark=requester_id))
+        except Exception as e:
+            logger.warning(f"afdian_verify 调用失败: {e}")
+            return False
+        if len(self._afdian_cache) >= self.afdian_capacity:
+            self._afdian_cache = {
+                k: v
+                for k, v in self._afdian_cache.items()
+                if now - v[0] < self.afdian_ttl
+            }
+        self._afdian_cache[requester_id] = (now, ok)
+        return ok
+
+
+capabilities = Capabilities()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from collections.abc import Mapping, MutableMapping
+from collections.abc import Iterable, Mapping, MutableMapping
+from dataclasses import dataclass, replace
 from types import MappingProxyType, UnionType
 from typing import Any, Union, get_args, get_origin, get_type_hints
 
@@ -8,6 +9,54 @@ from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.star.context import Context
 
+from .rules import RuleEngine
+
+
+class _FieldAccessor:
+    """
+    声明字段的数据描述符：读写直接落到底层 dict
+    """
+
+    __slots__ = ("key", "default")
+
+    def __init__(self, key: str, default: Any = None):
+        self.key = key
+        self.default = default
+
+    def __get__(self, obj: ConfigNode | None, owner: type) -> Any:
+        if obj is None:
+            return self
+        return obj._data.get(self.key, self.default)
+
+    def __set__(self, obj: ConfigNode, value: Any) -> None:
+        obj._data[self.key] = value
+
+
+class _ChildAccessor:
+    """
+    子节点描述符：首次访问时构造子节点，之后缓存在实例 __dict__ 中，
+    后续读取不再经过描述符
+    """
+
+    __slots__ = ("key", "node_cls")
+
+    def __init__(self, key: str, node_cls: type[ConfigNode]):
+        self.key = key
+        self.node_cls = node_cls
+
+    def __get__(self, obj: ConfigNode | None, owner: type) -> Any:
+        if obj is None:
+            return self
+        value = obj._data.get(self.key)
+        if not isinstance(value, MutableMapping):
+            raise TypeError(
+                f"[config:{owner.__name__}] "
+                f"字段 {self.key} 期望 dict，实际是 {type(value).__name__}"
+            )
+        child = self.node_cls(value)
+        obj.__dict__[self.key] = child
+        return child
+
 
 class ConfigNode:
     """
@@ -18,10 +67,12 @@ class ConfigNode:
     - 声明字段：读写，写回底层 dict
     - 未声明字段和下划线字段：仅挂载属性，不写回
     - 支持 ConfigNode 多层嵌套（lazy + cache）
+    - 每个子类首次实例化时编译一次字段描述符，之后读取即一次 dict 取值
     """
 
     _SCHEMA_CACHE: dict[type, dict[str, type]] = {}
     _FIELDS_CACHE: dict[type, set[str]] = {}
+    _COMPILED: set[type] = set()
 
     @classmethod
     def _schema(cls) -> dict[str, type]:
@@ -40,46 +91,44 @@ class ConfigNode:
             return type(None) in get_args(tp)
         return False
 
+    @classmethod
+    def _compile(cls) -> None:
+        """为声明字段生成描述符（每个类只执行一次）"""
+        if cls in ConfigNode._COMPILED:
+            return
+        schema = cls._schema()
+        for key in cls._fields():
+            current = getattr(cls, key, None)
+            if isinstance(current, (_FieldAccessor, _ChildAccessor)):
+                continue
+            tp = schema[key]
+            if isinstance(tp, type) and issubclass(tp, ConfigNode):
+                setattr(cls, key, _ChildAccessor(key, tp))
+            else:
+                setattr(cls, key, _FieldAccessor(key, current))
+        ConfigNode._COMPILED.add(cls)
+
     def __init__(self, data: MutableMapping[str, Any]):
+        cls = self.__class__
+        cls._compile()
         object.__setattr__(self, "_data", data)
-        object.__setattr__(self, "_children", {})
         for key, tp in self._schema().items():
             if key.startswith("_"):
                 continue
             if key in data:
                 continue
-            if hasattr(self.__class__, key):
+            accessor = cls.__dict__.get(key)
+            if isinstance(accessor, _FieldAccessor) and accessor.default is not None:
                 continue
             if self._is_optional(tp):
                 continue
-            logger.warning(f"[config:{self.__class__.__name__}] 缺少字段: {key}")
-
-    def __getattr__(self, key: str) -> Any:
-        if key in self._fields():
-            value = self._data.get(key)
-            tp = self._schema().get(key)
-
-            if isinstance(tp, type) and issubclass(tp, ConfigNode):
-                children: dict[str, ConfigNode] = self.__dict__["_children"]
-                if key not in children:
-                    if not isinstance(value, MutableMapping):
-                        raise TypeError(
-                            f"[config:{self.__class__.__name__}] "
-                            f"字段 {key} 期望 dict，实际是 {type(value).__name__}"
-                        )
-                    children[key] = tp(value)
-                return children[key]
-
-            return value
-
-        if key in self.__dict__:
-            return self.__dict__[key]
-
-        raise AttributeError(key)
+            logger.warning(f"[config:{cls.__name__}] 缺少字段: {key}")
 
     def __setattr__(self, key: str, value: Any) -> None:
         if key in self._fields():
             self._data[key] = value
+            # 整体替换子节点时丢弃旧缓存
+            self.__dict__.pop(key, None)
             return
         object.__setattr__(self, key, value)
 
@@ -108,6 +157,21 @@ class CheckConfig(ConfigNode):
     batch_size: int
     check_new_group: bool
     delay: int
+    buffer_size: int
+    buffer_budget: int
+
+
+class RosterConfig(ConfigNode):
+    page_size: int
+    cache_ttl: int
+
+
+class SweepConfig(ConfigNode):
+    enable: bool
+    interval: int
+    concurrency: int
+    rate: float
+    auto_leave: bool
 
 
 class RequestConfig(ConfigNode):
@@ -123,6 +187,13 @@ class RequestConfig(ConfigNode):
     auto_agree_friend: bool
     auto_reject_friend: bool
 
+    # 关键词 / ID 区间规则
+    rules: list[str]
+
+    def __init__(self, data: MutableMapping[str, Any]):
+        super().__init__(data)
+        self.engine = RuleEngine(self.rules or [])
+
 
 class NoticeConfig(ConfigNode):
     block_small_group: bool
@@ -142,12 +213,43 @@ class NoticeConfig(ConfigNode):
         return group_id in self.mutual_blacklist
 
 
+@dataclass(frozen=True, slots=True)
+class ListSnapshot:
+    """
+    名单的不可变快照
+    写入方构造新快照后整体替换，读取方取一次快照即可在多个 await 之间看到一致的名单
+    """
+
+    group_blacklist: frozenset[str] = frozenset()
+    user_blacklist: frozenset[str] = frozenset()
+    manage_users: frozenset[str] = frozenset()
+    mutual_blacklist: frozenset[str] = frozenset()
+
+    def is_black_group(self, group_id: str | int) -> bool:
+        return str(group_id) in self.group_blacklist
+
+    def is_block_user(self, user_id: str | int) -> bool:
+        return str(user_id) in self.user_blacklist
+
+    def is_manage_user(self, user_id: str | int) -> bool:
+        return str(user_id) in self.manage_users
+
+    def is_mutual(self, user_id: str | int) -> bool:
+        return str(user_id) in self.mutual_blacklist
+
+
 class PluginConfig(ConfigNode):
     manage_group: str
     manage_users: list[str]
+    share_lists: bool
+    storage: str
+    timeout: int
+    trace_rate: float
     check: CheckConfig
+    roster: RosterConfig
     request: RequestConfig
     notice: NoticeConfig
+    sweep: SweepConfig
 
     def __init__(self, config: AstrBotConfig, context: Context):
         super().__init__(config)
@@ -172,6 +274,13 @@ class PluginConfig(ConfigNode):
         # 5. 黑名单引用
         self.group_blacklist = self.request.group_blacklist
         self.user_blacklist = self.request.user_blacklist
+        self.mutual_blacklist = self.notice.mutual_blacklist
+        self._lists = ListSnapshot(
+            frozenset(self.group_blacklist),
+            frozenset(self.user_blacklist),
+            frozenset(self.manage_users),
+            frozenset(self.mutual_blacklist),
+        )
 
         self.save_config()
 
@@ -180,59 +289,110 @@ class PluginConfig(ConfigNode):
         """过滤并规范化数字 ID"""
         return [str(i) for i in ids if str(i).isdigit()]
 
+    @staticmethod
+    def _extend(items: list[str], values: Iterable[str | int]) -> int:
+        """把 values 中不在 items 里的 ID 追加进去，返回新增数量"""
+        seen = set(items)
+        new = [v for v in dict.fromkeys(map(str, values)) if v not in seen]
+        items.extend(new)
+        return len(new)
+
+    def snapshot(self) -> ListSnapshot:
+        """当前名单快照（只读，随写入整体替换）"""
+        return self._lists
+
+    def _publish(self, key: str) -> None:
+        """名单 key 变化后发布新快照"""
+        self._lists = replace(self._lists, **{key: frozenset(getattr(self, key))})
+
+    def replace_list(self, key: str, values: Iterable[str], save: bool = True) -> None:
+        """整体替换名单 key 的内容（sqlite 存储把库中的名单写回配置时使用）"""
+        items: list[str] = getattr(self, key)
+        items[:] = sorted(values)
+        self._publish(key)
+        if save:
+            self.save_config()
+
     def _append_admin_to_manage_users(self) -> None:
         """确保管理员在审批员列表中"""
         if self.admin_id and self.admin_id not in self.manage_users:
             self.manage_users.append(self.admin_id)
 
-    def is_black_group(self, group_id: str) -> bool:
-        return group_id in self.group_blacklist
+    def is_black_group(self, group_id: str | int) -> bool:
+        return self._lists.is_black_group(group_id)
 
     def add_black_group(self, group_id: str | int) -> None:
         """将群聊加入黑名单"""
         gid = str(group_id)
         if gid not in self.group_blacklist:
             self.group_blacklist.append(gid)
+            self._publish("group_blacklist")
             self.save_config()
             logger.info(f"群聊 {gid} 已加入黑名单")
 
+    def add_black_groups(self, group_ids: Iterable[str | int]) -> int:
+        """批量加入群聊黑名单，只保存一次，返回新增数量"""
+        added = self._extend(self.group_blacklist, group_ids)
+        if added:
+            self._publish("group_blacklist")
+            self.save_config()
+            logger.info(f"{added} 个群聊已加入黑名单")
+        return added
+
     def remove_black_group(self, group_id: str | int) -> None:
         """将群聊从黑名单移除"""
         gid = str(group_id)
         if gid in self.group_blacklist:
             self.group_blacklist.remove(gid)
+            self._publish("group_blacklist")
             self.save_config()
             logger.info(f"群聊 {gid} 已从黑名单移除")
 
-    def is_block_user(self, user_id: str) -> bool:
+    def is_block_user(self, user_id: str | int) -> bool:
         """判断用户是否被拉黑"""
-        return user_id in self.user_blacklist
+        return self._lists.is_block_user(user_id)
 
     def add_block_user(self, user_id: str | int) -> None:
         """将用户加入拉黑名单"""
         uid = str(user_id)
         if uid not in self.user_blacklist:
             self.user_blacklist.append(uid)
+            self._publish("user_blacklist")
             self.save_config()
             logger.info(f"用户 {uid} 已加入拉黑名单")
 
+    def add_block_users(self, user_ids: Iterable[str | int]) -> int:
+        """批量加入拉黑名单，只保存一次，返回新增数量"""
+        added = self._extend(self.user_blacklist, user_ids)
+        if added:
+            self._publish("user_blacklist")
+            self.save_config()
+            logger.info(f"{added} 个用户已加入拉黑名单")
+        return added
+
     def remove_block_user(self, user_id: str | int) -> None:
         """将用户从拉黑名单移除"""
         uid = str(user_id)
         if uid in self.user_blacklist:
             self.user_blacklist.remove(uid)
+            self._publish("user_blacklist")
             self.save_config()
             logger.info(f"用户 {uid} 已从拉黑名单移除")
 
-    def is_manage_user(self, user_id: str) -> bool:
+    def is_mutual(self, user_id: str | int) -> bool:
+        """判断用户是否为互斥成员"""
+        return self._lists.is_mutual(user_id)
+
+    def is_manage_user(self, user_id: str | int) -> bool:
         """判断用户是否为审批员"""
-        return user_id in self.manage_users
+        return self._lists.is_manage_user(user_id)
 
     def add_manage_user(self, user_id: str | int) -> None:
         """将用户加入审批员"""
         uid = str(user_id)
         if uid not in self.manage_users:
             self.manage_users.append(uid)
+            self._publish("manage_users")
             self.save_config()
             logger.info(f"用户 {uid} 已加入审批员")
 
@@ -241,5 +401,6 @@ class PluginConfig(ConfigNode):
         uid = str(user_id)
         if uid in self.manage_users:
             self.manage_users.remove(uid)
+            self._publish("manage_users")
             self.save_config()
             logger.info(f"用户 {uid} 已从审批员移除")
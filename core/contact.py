@@ -1,19 +1,31 @@
+import asyncio
 import random
+import time
 
+from astrbot.api import logger
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .bot import BotContext, BotRegistry
 from .config import PluginConfig
+from .roster import RosterEntry
 from .utils import get_ats
 
+# 随机推荐最多几张名片
+MAX_RANDOM = 5
+# 同时发送的名片数
+SEND_CONCURRENCY = 3
+# 多久内发过言算活跃好友
+ACTIVE_WINDOW = 7 * 24 * 3600
+
 
 class ContactHandle:
-    def __init__(self, config: PluginConfig):
+    def __init__(self, config: PluginConfig, bots: BotRegistry):
         self.cfg = config
+        self.bots = bots
 
-    @staticmethod
-    async def cqhttp_send(event: AiocqhttpMessageEvent, payload: dict):
+    async def cqhttp_send(self, event: AiocqhttpMessageEvent, payload: dict):
         """用 aiocqhttp 发送消息"""
         if event.is_private_chat():
             payload["user_id"] = int(event.get_sender_id())
@@ -23,7 +35,8 @@ class ContactHandle:
             action = "send_group_msg"
 
         try:
-            result = await event.bot.api.call_action(action, **payload)
+            client = self.bots.get(event).client
+            result = await client.call_action(action, **payload)
             event.stop_event()
             return result
         except Exception as e:
@@ -41,28 +54,84 @@ class ContactHandle:
         payload = {"message": [{"type": "contact", "data": contact}]}
         await self.cqhttp_send(event, payload)
 
-    async def _get_random_target(self, client) -> tuple[list[int], list[int]]:
-        """当没有目标时，随机补一个"""
-        if random.random() < 0.5:
-            friend_list = await client.get_friend_list()
-            return [random.choice(friend_list)["user_id"]], []
-        else:
-            group_list = await client.get_group_list()
-            return [], [random.choice(group_list)["group_id"]]
+    @staticmethod
+    def _has_room(entry: RosterEntry) -> bool:
+        """群未满员（拿不到上限时视为未满）"""
+        cap = entry.raw.get("max_member_count") or 0
+        return not cap or entry.member_count < cap
+
+    async def _get_random_target(
+        self, bot: BotContext, kind: str = "", k: int = 1
+    ) -> tuple[list[int], list[int]]:
+        """
+        当没有目标时，从缓存的列表里随机抽 k 个
+        - 群：只抽未满员的群，越活跃越容易被抽中
+        - 好友：优先抽最近发过言的好友
+        """
+        if not kind:
+            kind = "好友" if random.random() < 0.5 else "群"
+
+        if kind == "好友":
+            await bot.friends.load(bot.client)
+            cutoff = time.time() - ACTIVE_WINDOW
+            activity = bot.activity
+            picked = bot.friends.sample(
+                k, lambda e: activity.user_seen(e.id) >= cutoff
+            ) or bot.friends.sample(k)
+            return [int(e.id) for e in picked], []
+
+        await bot.groups.load(bot.client)
+        # 先均匀抽一批候选，再按活跃度加权无放回地取 k 个
+        candidates = bot.groups.sample(k * 4, self._has_room)
+        now = time.time()
+
+        def key(e: RosterEntry) -> float:
+            return random.random() ** (1 / (bot.activity.rate(e.id, now) + 0.1))
+
+        candidates.sort(key=key, reverse=True)
+        return [], [int(e.id) for e in candidates[:k]]
+
+    async def _send_all(
+        self, event: AiocqhttpMessageEvent, uids: list[int], gids: list[int]
+    ) -> int:
+        """并发发送名片，单张失败不影响其余，返回失败数"""
+        sem = asyncio.Semaphore(SEND_CONCURRENCY)
+
+        async def send(**target):
+            async with sem:
+                await self._send_contact(event, **target)
+
+        results = await asyncio.gather(
+            *(send(uid=uid) for uid in uids),
+            *(send(gid=gid) for gid in gids),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        for e in failed:
+            logger.warning(f"推荐名片发送失败: {e}")
+        return len(failed)
 
     async def contact(self, event: AiocqhttpMessageEvent):
-        """推荐 <群号/@群友/@qq>"""
+        """推荐 <群号/@群友/@qq> 或 推荐 <群|好友> [数量]"""
         args = event.message_str.split()[1:]
+        bot = self.bots.get(event)
 
-        gids = [int(arg) for arg in args if arg.isdigit()]
-        uids = get_ats(event)
-
-        if not uids and not gids:
-            uids, gids = await self._get_random_target(client=event.bot)
+        # 随机推荐：此时数字表示数量
+        if kind := next((a for a in args if a in ("群", "好友")), ""):
+            k = next((int(a) for a in args if a.isdigit()), 1)
+            uids, gids = await self._get_random_target(bot, kind, min(k, MAX_RANDOM))
+        else:
+            gids = [int(arg) for arg in args if arg.isdigit()]
+            uids = get_ats(event)
+            if not uids and not gids:
+                uids, gids = await self._get_random_target(bot)
 
-        if uids:
-            for uid in uids:
-                await self._send_contact(event, uid=uid)
-        if gids:
-            for gid in gids:
-                await self._send_contact(event, gid=gid)
+        failed = await self._send_all(event, uids, gids)
+        if failed:
+            # 名片走 aiocqhttp 直接发送，失败提示也从同一条路发回当前会话
+            total = len(uids) + len(gids)
+            text = f"{failed} 条发送失败" + (f"（共 {total} 条）" if total > 1 else "")
+            try:
+                await self.cqhttp_send(event, {"message": text})
+            except Exception as e:
+                logger.warning(f"推荐失败提示发送失败: {e}")
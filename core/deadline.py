@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import Counter
+from collections.abc import Awaitable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from astrbot.api import logger
+
+from .tracing import NOOP_SPAN, Span
+
+T = TypeVar("T")
+
+# 当前阶段的截止时间（monotonic），由 Deadline.run 在阶段任务内设置
+_expires: ContextVar[float | None] = ContextVar("relationship_deadline", default=None)
+_stage: ContextVar[str] = ContextVar("relationship_stage", default="")
+
+# 没有处于任何阶段时，单次接口调用的超时
+DEFAULT_CALL_TIMEOUT = 30.0
+# 阶段兜底超时比接口超时多留的余量，让接口先超时、走降级路径
+_GRACE = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """阶段预算耗尽"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} 超时")
+        self.stage = stage
+
+
+class TimeoutStats:
+    """按阶段统计超时次数"""
+
+    def __init__(self):
+        self.stages: Counter[str] = Counter()
+        self.calls: Counter[str] = Counter()
+
+    def stage(self, name: str) -> None:
+        self.stages[name] += 1
+
+    def call(self, action: str) -> None:
+        self.calls[f"{_stage.get() or '-'}:{action}"] += 1
+
+    def summary(self) -> list[str]:
+        lines = [f"阶段 {k}：{v} 次" for k, v in self.stages.most_common()]
+        lines += [f"接口 {k}：{v} 次" for k, v in self.calls.most_common(10)]
+        return lines
+
+
+def call_timeout() -> float:
+    """当前接口调用可用的时间：阶段剩余时间，或默认超时"""
+    expires = _expires.get()
+    if expires is None:
+        return DEFAULT_CALL_TIMEOUT
+    return expires - time.monotonic()
+
+
+class Deadline:
+    """
+    一次处理流程的总预算，按阶段切分
+
+    - run() 在独立任务中执行一个阶段，任务内的接口调用都以阶段截止时间为超时
+    - 接口先于阶段超时，查询类调用可以退回缓存或默认值继续往下走
+    - 阶段本身超时则取消整个阶段（包括未完成的接口调用），抛 DeadlineExceeded
+    - 带 trace 时每个阶段记一个 span，阶段内的接口调用挂在它下面
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget: float,
+        stats: TimeoutStats,
+        trace: Span = NOOP_SPAN,
+    ):
+        self.name = name
+        self.stats = stats
+        self.trace = trace
+        self.expires = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    async def run(
+        self, stage: str, aw: Awaitable[T], budget: float | None = None
+    ) -> T:
+        """
+        :param budget: 本阶段最多可用的秒数，不超过总预算剩余
+        """
+        name = f"{self.name}.{stage}"
+        timeout = self.remaining()
+        if budget is not None:
+            timeout = min(timeout, budget)
+        if timeout <= 0:
+            if asyncio.iscoroutine(aw):
+                aw.close()
+            self.stats.stage(name)
+            raise DeadlineExceeded(name)
+
+        span = self.trace.child(stage, budget=round(timeout, 3))
+
+        async def _stage_task() -> Any:
+            _expires.set(time.monotonic() + timeout)
+            _stage.set(name)
+            token = span.activate()
+            try:
+                return await aw
+            finally:
+                span.deactivate(token)
+
+        # 阶段放进独立任务：任务复制一份上下文，阶段内设置的截止时间不会带回调用方
+        # （3.12 起 wait_for 直接在调用方任务里执行协程，不能依赖它隔离上下文）
+        task = asyncio.create_task(_stage_task())
+        try:
+            return await asyncio.wait_for(task, timeout + _GRACE)
+        except asyncio.TimeoutError:
+            self.stats.stage(name)
+            span.fail("deadline exceeded")
+            logger.warning(f"{name} 超时（{timeout:.1f}s），已取消")
+            raise DeadlineExceeded(name) from None
+        except Exception as e:
+            span.fail(e)
+            raise
+        finally:
+            span.end()
+
+
+timeouts = TimeoutStats()
@@ -1,4 +1,3 @@
-import random
 from typing import Any
 
 from aiocqhttp import CQHttp
@@ -8,8 +7,11 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .bot import BotContext
+from .buffer import MessageBuffer
 from .config import PluginConfig
-from .utils import get_ats, get_reply_text, parse_multi_input
+from .deadline import Deadline, DeadlineExceeded, timeouts
+from .utils import get_ats, get_reply_text, parse_multi_input, parse_name_terms
 
 
 class ForwardTool:
@@ -92,6 +94,7 @@ class ForwardTool:
         forward_group_id: int | None = None,
         forward_user_id: int | None = None,
         batch_size: int = 0,
+        buffer: MessageBuffer | None = None,
     ) -> bool:
         """
         转发消息
@@ -101,12 +104,23 @@ class ForwardTool:
         :param source_user_id: 源用户ID
         :param forward_group_id: 转发群组ID(优先使用)
         :param forward_user_id: 转发用户ID
+        :param buffer: 本地消息缓冲，命中时不再调用历史消息接口
         """
         try:
-            # 获取消息历史
-            messages = await ForwardTool._get_msg_history(
-                client, group_id=source_group_id, user_id=source_user_id, count=count
-            )
+            messages = None
+            # 优先读本地缓冲
+            if buffer and source_group_id:
+                gid = str(source_group_id)
+                if buffer.covers(gid, count):
+                    messages = buffer.recent(gid, count)
+            # 未命中再获取消息历史
+            if not messages:
+                messages = await ForwardTool._get_msg_history(
+                    client,
+                    group_id=source_group_id,
+                    user_id=source_user_id,
+                    count=count,
+                )
             if not messages:
                 return False
             # 构造转发节点
@@ -128,6 +142,7 @@ class ForwardTool:
     async def check_messages(
         event: AiocqhttpMessageEvent,
         *,
+        bot: BotContext,
         target_id: str | int | None = None,
         count: int = 0,
     ):
@@ -136,9 +151,10 @@ class ForwardTool:
         支持：
         - @用户
         - 群序号（来自群列表）
+        - 名:关键词 / 名~关键词（按群名选取）
         - 群号 / QQ
         """
-        client = event.bot
+        client, groups = bot.client, bot.groups
         sgid: int | None = None
         suid: int | None = None
 
@@ -150,16 +166,30 @@ class ForwardTool:
         if not suid:
             raw = str(target_id or get_reply_text(event) or "").strip()
 
-            # 先解析可能的序号 / ID
-            group_list = await client.get_group_list()
-            indexes, ids = parse_multi_input(raw, total=len(group_list))
+            # 先解析可能的名称 / 序号 / ID（序号与群列表一致）
+            await groups.load(client)
+            raw, terms = parse_name_terms(raw)
+            indexes, ids = parse_multi_input(raw, total=len(groups))
+
+            # 2.1 名称 → 群（取最佳匹配）
+            if terms:
+                query, fuzzy = terms[0]
+                matched = groups.match(query, fuzzy=fuzzy)
+                if not matched:
+                    yield event.plain_result(f"没有名称匹配「{query}」的群聊")
+                    return
+                sgid = int(matched[0].id)
+                yield event.plain_result(
+                    f"抽查 {matched[0].name}({matched[0].id})"
+                    + (f"，另有 {len(matched) - 1} 个匹配" if len(matched) > 1 else "")
+                )
 
-            # 2.1 序号 → 群
-            if indexes:
-                idx = min(indexes)
-                sgid = int(group_list[idx]["group_id"])
+            # 2.2 序号 → 群
+            elif indexes:
+                idx = indexes.first()
+                sgid = int(groups.at(idx).id)
 
-            # 2.2 明确 ID 视为群号
+            # 2.3 明确 ID 视为群号
             elif ids:
                 value = next(iter(ids))
                 if value.isdigit():
@@ -167,11 +197,13 @@ class ForwardTool:
 
         # 3.兜底：随机群
         if not sgid and not suid:
-            group_list = await client.get_group_list()
-            if not group_list:
+            await groups.load(client)
+            if not len(groups):
                 yield event.plain_result("未找到可用的群聊或用户，无法进行抽查")
                 return
-            sgid = int(random.choice(group_list)["group_id"])
+            # 按活跃度加权，越活跃越容易被抽中
+            gids = [e.id for e in groups.entries]
+            sgid = int(bot.activity.weighted_choice(gids))
 
         # 执行抽查
         logger.debug(
@@ -183,32 +215,38 @@ class ForwardTool:
             sender_id_str = str(event.get_sender_id())
             forward_group_id = int(group_id_str) if group_id_str.isdigit() else None
             forward_user_id = int(sender_id_str) if sender_id_str.isdigit() else None
-            await ForwardTool.source_forward(
-                client=client,
-                count=count,
-                source_group_id=sgid,
-                source_user_id=suid,
-                forward_group_id=forward_group_id,
-                forward_user_id=forward_user_id,
+            await Deadline("check", bot.cfg.timeout, timeouts).run(
+                "forward",
+                ForwardTool.source_forward(
+                    client=client,
+                    buffer=bot.messages,
+                    count=count,
+                    source_group_id=sgid,
+                    source_user_id=suid,
+                    forward_group_id=forward_group_id,
+                    forward_user_id=forward_user_id,
+                ),
             )
             event.stop_event()
+        except DeadlineExceeded:
+            yield event.plain_result("抽查超时，请稍后重试")
         except Exception as e:
             yield event.plain_result(f"抽查失败：{e}")
             logger.error(f"抽查失败: {e}")
 
     @staticmethod
     async def send_admin(
-        event: AiocqhttpMessageEvent,
+        client: CQHttp,
         config: PluginConfig,
         text: str,
     ):
         try:
             if config.manage_group:
-                await event.bot.send_group_msg(
+                await client.send_group_msg(
                     group_id=int(config.manage_group), message=text
                 )
             elif config.admin_id:
-                await event.bot.send_private_msg(
+                await client.send_private_msg(
                     user_id=int(config.admin_id), message=text
                 )
         except Exception as e:
@@ -0,0 +1,429 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Collection, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from astrbot.api import logger
+
+
+@dataclass(slots=True)
+class JournalRecord:
+    """一条关系操作记录"""
+
+    ts: float
+    bot: str
+    action: str
+    target: str
+    operator: str
+    reason: str
+    outcome: str
+
+    def to_line(self) -> bytes:
+        row = [
+            round(self.ts, 3),
+            self.bot,
+            self.action,
+            self.target,
+            self.operator,
+            self.reason,
+            self.outcome,
+        ]
+        text = json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+        return text.encode() + b"\n"
+
+    @classmethod
+    def from_line(cls, line: bytes) -> "JournalRecord | None":
+        try:
+            return cls(*json.loads(line))
+        except Exception:
+            return None
+
+    def display(self) -> str:
+        t = time.strftime("%m-%d %H:%M:%S", time.localtime(self.ts))
+        text = f"{t} [{self.bot}] {self.action} {self.target}"
+        if self.operator:
+            text += f" by {self.operator}"
+        if self.reason:
+            text += f"：{self.reason}"
+        return f"{text} → {self.outcome}"
+
+
+# 估算段内记录数时假定的单条记录字节数（偏小，宁可布隆过滤器大一点）
+_RECORD_BYTES = 96
+# 布隆过滤器的目标误判率
+_BLOOM_FP = 0.01
+
+
+class _Bloom:
+    """段内目标的布隆过滤器，用于跳过不含目标的段"""
+
+    # 旧版本索引文件的固定参数
+    BITS = 1 << 15
+    HASHES = 3
+
+    def __init__(
+        self, data: bytes | None = None, bits: int = BITS, hashes: int = HASHES
+    ):
+        self.hashes = hashes
+        self.bits = bytearray(data) if data else bytearray(bits // 8)
+        self.size = len(self.bits) * 8
+
+    @classmethod
+    def for_capacity(cls, n: int, fp: float = _BLOOM_FP) -> "_Bloom":
+        """按预计元素数和误判率确定位数和哈希次数"""
+        n = max(n, 1)
+        bits = math.ceil(-n * math.log(fp) / math.log(2) ** 2 / 8) * 8
+        hashes = min(max(round(bits / n * math.log(2)), 1), 16)
+        return cls(bits=bits, hashes=hashes)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4 : i * 4 + 4], "little") % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class _SegmentIndex:
+    """
+    段的稀疏索引：时间范围、每隔 N 条记录一个 (时间, 偏移) 标记、目标布隆过滤器
+    """
+
+    def __init__(self, capacity: int = 0):
+        self.first_ts = 0.0
+        self.last_ts = 0.0
+        self.count = 0
+        self.marks: list[tuple[float, int]] = []
+        self.bloom = _Bloom.for_capacity(capacity) if capacity else _Bloom()
+
+    def add(self, rec: JournalRecord, offset: int, mark_every: int) -> None:
+        if not self.count:
+            self.first_ts = rec.ts
+        self.last_ts = rec.ts
+        if self.count % mark_every == 0:
+            self.marks.append((rec.ts, offset))
+        self.count += 1
+        self.bloom.add(rec.target)
+
+    def seek(self, since: float) -> int:
+        """不早于 since 的记录的起始偏移（保守取前一个标记）"""
+        offset = 0
+        for ts, pos in self.marks:
+            if ts >= since:
+                break
+            offset = pos
+        return offset
+
+    def dump(self) -> str:
+        return json.dumps(
+            {
+                "first_ts": self.first_ts,
+                "last_ts": self.last_ts,
+                "count": self.count,
+                "marks": self.marks,
+                "bloom": self.bloom.bits.hex(),
+                "bloom_hashes": self.bloom.hashes,
+            }
+        )
+
+    @classmethod
+    def load(cls, text: str) -> "_SegmentIndex":
+        data = json.loads(text)
+        idx = cls()
+        idx.first_ts = data["first_ts"]
+        idx.last_ts = data["last_ts"]
+        idx.count = data["count"]
+        idx.marks = [tuple(m) for m in data["marks"]]  # type: ignore[misc]
+        idx.bloom = _Bloom(
+            bytes.fromhex(data["bloom"]), hashes=data.get("bloom_hashes", _Bloom.HASHES)
+        )
+        return idx
+
+
+class Journal:
+    """
+    追加写的关系操作日志
+
+    - 记录先进缓冲区，攒够 flush_every 条或每隔 flush_interval 秒（后台定时）落盘并 fsync
+    - 落盘、fsync 和改写索引在工作线程里进行，不阻塞事件循环
+    - 单段超过 max_bytes 后滚动到新段
+    - 每段带一个稀疏索引文件（.idx），按目标 / 时间查询时跳过无关的段和区间；
+      布隆过滤器按段内预计记录数确定大小
+    """
+
+    SUFFIX = ".log"
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_bytes: int = 4 * 1024 * 1024,
+        flush_every: int = 32,
+        flush_interval: float = 5.0,
+        mark_every: int = 256,
+    ):
+        self.dir = directory
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.mark_every = mark_every
+
+        # 每段预计的记录数，用于确定布隆过滤器大小
+        self.capacity = max_bytes // _RECORD_BYTES
+
+        self._buffer: list[JournalRecord] = []
+        # 保护段文件和索引：落盘在工作线程里，查询在事件循环里
+        self._io_lock = threading.Lock()
+        self._indexes: dict[int, _SegmentIndex] = {}
+        self._flushing: asyncio.Task | None = None
+        self._timer: asyncio.Task | None = None
+
+        segments = self._segments()
+        self._seq = segments[-1] if segments else 1
+        self._size = self._path(self._seq).stat().st_size if segments else 0
+        self._index = self._load_index(self._seq)
+
+    # -------------------------
+    # 文件
+    # -------------------------
+    def _path(self, seq: int, suffix: str = SUFFIX) -> Path:
+        return self.dir / f"{seq:06d}{suffix}"
+
+    def _segments(self) -> list[int]:
+        return sorted(
+            int(p.stem) for p in self.dir.glob(f"*{self.SUFFIX}") if p.stem.isdigit()
+        )
+
+    def _load_index(self, seq: int) -> _SegmentIndex:
+        cached = self._indexes.get(seq)
+        if cached:
+            return cached
+        idx_path = self._path(seq, ".idx")
+        idx = None
+        if idx_path.exists():
+            try:
+                idx = _SegmentIndex.load(idx_path.read_text("utf-8"))
+            except Exception as e:
+                logger.warning(f"日志索引损坏，重建: {idx_path} ({e})")
+        if idx is None:
+            idx = self._rebuild_index(seq)
+        self._indexes[seq] = idx
+        return idx
+
+    def _rebuild_index(self, seq: int) -> _SegmentIndex:
+        idx = _SegmentIndex(self.capacity)
+        path = self._path(seq)
+        if path.exists():
+            with path.open("rb") as f:
+                offset = 0
+                for line in f:
+                    rec = JournalRecord.from_line(line)
+                    if rec:
+                        idx.add(rec, offset, self.mark_every)
+                    offset += len(line)
+        return idx
+
+    # -------------------------
+    # 写入
+    # -------------------------
+    def record(
+        self,
+        bot: str,
+        action: str,
+        target: str | int,
+        *,
+        operator: str | int = "",
+        reason: str = "",
+        outcome: str = "成功",
+    ) -> None:
+        self._buffer.append(
+            JournalRecord(
+                ts=time.time(),
+                bot=str(bot),
+                action=action,
+                target=str(target),
+                operator=str(operator),
+                reason=reason,
+                outcome=outcome,
+            )
+        )
+        if len(self._buffer) >= self.flush_every:
+            self._flush_soon()
+
+    # -------------------------
+    # 落盘
+    # -------------------------
+    def start(self) -> None:
+        """启动定时落盘，空闲时缓冲区里的记录也不会一直留在内存"""
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_loop())
+
+    def stop(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._buffer:
+                await self.flush_async()
+
+    def _flush_soon(self) -> None:
+        """在后台线程落盘；没有事件循环时直接同步落盘"""
+        if self._flushing and not self._flushing.done():
+            return
+        try:
+            self._flushing = asyncio.get_running_loop().create_task(
+                self.flush_async()
+            )
+        except RuntimeError:
+            self.flush()
+
+    async def flush_async(self) -> None:
+        await asyncio.to_thread(self.flush)
+
+    def flush(self) -> None:
+        """把缓冲区写入段文件（阻塞，可在任意线程调用）"""
+        with self._io_lock:
+            if self._buffer:
+                self._write(self._take())
+
+    def _take(self) -> list[JournalRecord]:
+        records, self._buffer = self._buffer, []
+        return records
+
+    def _write(self, records: list[JournalRecord]) -> None:
+        try:
+            f = self._path(self._seq).open("ab")
+            try:
+                for rec in records:
+                    if self._size >= self.max_bytes:
+                        self._finish(f)
+                        f.close()
+                        self._seq += 1
+                        self._size = 0
+                        self._index = _SegmentIndex(self.capacity)
+                        self._indexes[self._seq] = self._index
+                        f = self._path(self._seq).open("ab")
+                    line = rec.to_line()
+                    f.write(line)
+                    self._index.add(rec, self._size, self.mark_every)
+                    self._size += len(line)
+                self._finish(f)
+            finally:
+                f.close()
+        except Exception as e:
+            logger.error(f"写入关系日志失败: {e}")
+
+    def _finish(self, f) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+        self._path(self._seq, ".idx").write_text(self._index.dump(), "utf-8")
+
+    def close(self) -> None:
+        self.stop()
+        self.flush()
+
+    # -------------------------
+    # 查询
+    # -------------------------
+    def query(
+        self,
+        target: str = "",
+        *,
+        bot: str = "",
+        since: float = 0.0,
+        limit: int = 20,
+    ) -> list[JournalRecord]:
+        """
+        按时间倒序返回最近的记录，可按目标、账号过滤
+        文件读取是阻塞的，在事件循环里放到线程里调用
+        """
+        with self._io_lock:
+            if self._buffer:
+                self._write(self._take())
+            return self._query(target, bot, since, limit)
+
+    def _query(
+        self, target: str, bot: str, since: float, limit: int
+    ) -> list[JournalRecord]:
+        found: list[JournalRecord] = []
+        for seq in reversed(self._segments()):
+            idx = self._load_index(seq)
+            if not idx.count:
+                continue
+            if idx.last_ts < since:
+                break
+            if target and target not in idx.bloom:
+                continue
+            matched = [
+                rec
+                for rec in self._scan(seq, idx.seek(since))
+                if rec.ts >= since
+                and (not target or rec.target == target)
+                and (not bot or rec.bot == bot)
+            ]
+            found.extend(reversed(matched))
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    def find(
+        self,
+        targets: Collection[str],
+        *,
+        since: float = 0.0,
+        actions: Collection[str] = (),
+    ) -> dict[str, list[JournalRecord]]:
+        """
+        一遍扫描查多个目标，返回 目标 -> 记录（按时间正序）
+        文件读取是阻塞的，批量核对时放到线程里调用
+        """
+        targets = set(targets)
+        found: dict[str, list[JournalRecord]] = {}
+        if not targets:
+            return found
+        with self._io_lock:
+            if self._buffer:
+                self._write(self._take())
+            for seq in self._segments():
+                idx = self._load_index(seq)
+                if not idx.count or idx.last_ts < since:
+                    continue
+                if not any(t in idx.bloom for t in targets):
+                    continue
+                for rec in self._scan(seq, idx.seek(since)):
+                    if (
+                        rec.ts >= since
+                        and rec.target in targets
+                        and (not actions or rec.action in actions)
+                    ):
+                        found.setdefault(rec.target, []).append(rec)
+        return found
+
+    def iter_records(self) -> Iterator[JournalRecord]:
+        """按时间正序逐条读出全部记录（先落盘缓冲区，读取本身不占额外内存）"""
+        self.flush()
+        segments = self._segments()
+        return (rec for seq in segments for rec in self._scan(seq, 0))
+
+    def _scan(self, seq: int, offset: int) -> Iterator[JournalRecord]:
+        with self._path(seq).open("rb") as f:
+            f.seek(offset)
+            for line in f:
+                rec = JournalRecord.from_line(line)
+                if rec:
+                    yield rec
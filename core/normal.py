@@ -1,41 +1,108 @@
+import asyncio
+import time
+
 from astrbot.api import logger
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .bot import BotRegistry
 from .config import PluginConfig
-from .utils import get_ats, get_nickname, parse_multi_input
+from .deadline import timeouts
+from .roster import Roster, RosterEntry
+from .utils import (
+    convert_duration_advanced,
+    get_ats,
+    get_nickname,
+    parse_multi_input,
+    parse_name_terms,
+)
+
+CONFIRM_WORD = "确认"
+PREVIEW_LIMIT = 20
 
 
 class NormalHandle:
-    def __init__(self, config: PluginConfig):
+    def __init__(self, config: PluginConfig, bots: BotRegistry):
         self.cfg = config
+        self.bots = bots
+
+    # ---------- 列表参数解析 ----------
+
+    @staticmethod
+    def _parse_list_args(
+        event: AiocqhttpMessageEvent, roster: Roster
+    ) -> tuple[int, str, str]:
+        """
+        群列表/好友列表 [排序] [关键词] [页码] -> (页码, 排序键, 关键词)
+        只有最后一个参数是数字时才作为页码，其余数字都是关键词（可按号码片段搜索）
+        """
+        args = event.message_str.split()[1:]
+        page, sort_key, keywords = 1, "", []
+        if args and args[-1].isdigit():
+            page = int(args.pop())
+        for arg in args:
+            if arg in roster.sort_keys:
+                sort_key = roster.sort_keys[arg]
+            else:
+                keywords.append(arg)
+        return page, sort_key, " ".join(keywords)
+
+    def _render_page(
+        self, roster: Roster, title: str, page: int, sort_key: str, keyword: str
+    ) -> str:
+        entries = roster.search(keyword, sort_key)
+        items, page, pages = roster.paginate(entries, page, self.cfg.roster.page_size)
+        info = "\n".join(e.display() for e in items)
+        head = f"【{title}】共 {len(roster)} 个"
+        if keyword:
+            head += f"，匹配「{keyword}」{len(entries)} 个"
+        return f"{head}（第 {page}/{pages} 页）：\n\n{info}"
+
+    # ---------- 按名称选取 ----------
+
+    @staticmethod
+    def _select_by_name(
+        roster: Roster, terms: list[tuple[str, bool]]
+    ) -> list[RosterEntry]:
+        selected: dict[str, RosterEntry] = {}
+        for query, fuzzy in terms:
+            for e in roster.match(query, fuzzy=fuzzy):
+                selected.setdefault(e.id, e)
+        return sorted(selected.values(), key=lambda e: e.ordinal)
+
+    @staticmethod
+    def _preview(command: str, raw: str, entries: list[RosterEntry]) -> str:
+        lines = [e.display() for e in entries[:PREVIEW_LIMIT]]
+        if len(entries) > PREVIEW_LIMIT:
+            lines.append(f"...等共 {len(entries)} 个")
+        return (
+            f"按名称匹配到 {len(entries)} 个目标：\n"
+            + "\n".join(lines)
+            + f"\n\n确认执行请发送：{command} {raw} {CONFIRM_WORD}"
+        )
 
     # ---------- 查看群列表 ----------
 
     async def get_group_list(self, event: AiocqhttpMessageEvent):
-        client = event.bot
-        group_list = await client.get_group_list()
-
-        info = "\n\n".join(
-            f"{i + 1}. {g['group_id']}: {g['group_name']}"
-            for i, g in enumerate(group_list)
-        )
-        text = f"【群列表】共加入 {len(group_list)} 个群：\n\n{info}"
+        """群列表 [人数|名称] [关键词] [页码]"""
+        bot = self.bots.get(event)
+        groups = bot.groups
+        await groups.load(bot.client)
+        page, sort_key, keyword = self._parse_list_args(event, groups)
+        text = self._render_page(groups, "群列表", page, sort_key, keyword)
         logger.debug(text)
         yield event.plain_result(text)
 
     # ---------- 查看好友列表 ----------
 
     async def get_friend_list(self, event: AiocqhttpMessageEvent):
-        client = event.bot
-        friend_list = await client.get_friend_list()
-
-        info = "\n\n".join(
-            f"{i + 1}. {f['user_id']}: {f['nickname']}"
-            for i, f in enumerate(friend_list)
-        )
-        text = f"【好友列表】共 {len(friend_list)} 位好友：\n{info}"
+        """好友列表 [名称] [关键词] [页码]"""
+        bot = self.bots.get(event)
+        friends = bot.friends
+        await friends.load(bot.client)
+        page, sort_key, keyword = self._parse_list_args(event, friends)
+        text = self._render_page(friends, "好友列表", page, sort_key, keyword)
         logger.debug(text)
         yield event.plain_result(text)
 
@@ -43,48 +110,73 @@ class NormalHandle:
 
     async def set_group_leave(self, event: AiocqhttpMessageEvent):
         """退群 <序号|群号|区间> [可批量]"""
-        client = event.bot
-        group_list = await client.get_group_list()
+        bot = self.bots.get(event)
+        client, groups = bot.client, bot.groups
+        await groups.load(client)
 
-        if not group_list:
+        if not len(groups):
             yield event.plain_result("我还没加任何群")
             return
 
-        raw = event.message_str
-        indexes, ids = parse_multi_input(raw, total=len(group_list))
+        args = event.message_str.split()[1:]
+        confirmed = CONFIRM_WORD in args
+        raw, terms = parse_name_terms(
+            " ".join(a for a in args if a != CONFIRM_WORD)
+        )
+        indexes, ids = parse_multi_input(raw, total=len(groups))
+        named = self._select_by_name(groups, terms)
+
+        if terms and not named:
+            yield event.plain_result("没有名称匹配的群聊")
+            return
+
+        if not indexes and not ids and not named:
+            yield event.plain_result("请输入群序号、群号或 名:关键词，可空格分隔")
+            return
 
-        if not indexes and not ids:
-            yield event.plain_result("请输入群序号或群号，可空格分隔")
+        if named and not confirmed:
+            yield event.plain_result(self._preview("退群", " ".join(args), named))
             return
 
-        group_map = {str(g["group_id"]): g for g in group_list}
+        targets = [groups.at(idx) for idx in indexes] + named
         msgs = []
 
-        # 序号
-        for idx in sorted(indexes):
-            g = group_list[idx]
-            await client.set_group_leave(group_id=int(g["group_id"]))
-            msgs.append(f"已退出群聊：{g['group_name']}({g['group_id']})")
-
         # 群号
         for gid in ids:
-            g = group_map.get(gid)
+            g = groups.get(gid)
             if not g:
                 msgs.append(f"不存在群聊：{gid}")
                 continue
-            await client.set_group_leave(group_id=int(gid))
-            msgs.append(f"已退出群聊：{g['group_name']}({gid})")
+            targets.append(g)
 
+        operator = event.get_sender_id()
+        left: set[str] = set()
+        for g in targets:
+            if g.id in left:
+                continue
+            try:
+                await client.set_group_leave(group_id=int(g.id))
+            except Exception as e:
+                bot.record("退群", g.id, operator=operator, outcome=f"失败: {e}")
+                msgs.append(f"退出群聊失败：{g.name}({g.id})")
+                continue
+            left.add(g.id)
+            bot.record("退群", g.id, operator=operator, reason="手动退群")
+            msgs.append(f"已退出群聊：{g.name}({g.id})")
+
+        if left:
+            groups.invalidate()
         yield event.plain_result("\n".join(msgs))
 
     # ---------- 删好友（@ / 批量 / 区间） ----------
 
     async def delete_friend(self, event: AiocqhttpMessageEvent):
         """删好友 <@昵称|QQ|序号|区间> [可批量]"""
-        client = event.bot
-        friend_list = await client.get_friend_list()
+        bot = self.bots.get(event)
+        client, friends = bot.client, bot.friends
+        await friends.load(client)
 
-        if not friend_list:
+        if not len(friends):
             yield event.plain_result("我还没有好友")
             return
 
@@ -92,32 +184,56 @@ class NormalHandle:
         user_ids = set(get_ats(event))
 
         # 再解析文本
-        raw = event.message_str
-        indexes, ids = parse_multi_input(raw, total=len(friend_list))
+        args = event.message_str.split()[1:]
+        confirmed = CONFIRM_WORD in args
+        raw, terms = parse_name_terms(
+            " ".join(a for a in args if a != CONFIRM_WORD)
+        )
+        indexes, ids = parse_multi_input(raw, total=len(friends))
+        named = self._select_by_name(friends, terms)
+
+        if terms and not named:
+            yield event.plain_result("没有名称匹配的好友")
+            return
+
+        if named and not confirmed:
+            yield event.plain_result(self._preview("删好友", " ".join(args), named))
+            return
 
         # 序号 → QQ
         for idx in indexes:
-            user_ids.add(str(friend_list[idx]["user_id"]))
+            user_ids.add(friends.at(idx).id)
 
-        # 直接 QQ
+        # 直接 QQ / 名称
         user_ids |= ids
+        user_ids.update(e.id for e in named)
 
         if not user_ids:
-            yield event.plain_result("请 @好友、输入 QQ 号或好友序号")
+            yield event.plain_result("请 @好友、输入 QQ 号、好友序号或 名:关键词")
             return
 
-        friend_map = {str(f["user_id"]): f for f in friend_list}
         msgs = []
+        deleted = False
+        operator = event.get_sender_id()
 
         for uid in sorted(user_ids):
-            f = friend_map.get(uid)
+            f = friends.get(uid)
             if not f:
                 msgs.append(f"不存在好友：{uid}")
                 continue
 
-            await client.delete_friend(user_id=int(uid))
-            msgs.append(f"已删除好友：{f['nickname']}({uid})")
+            try:
+                await client.delete_friend(user_id=int(uid))
+            except Exception as e:
+                bot.record("删好友", uid, operator=operator, outcome=f"失败: {e}")
+                msgs.append(f"删除好友失败：{f.name}({uid})")
+                continue
+            deleted = True
+            bot.record("删好友", uid, operator=operator, reason="手动删除")
+            msgs.append(f"已删除好友：{f.name}({uid})")
 
+        if deleted:
+            friends.invalidate()
         yield event.plain_result("\n".join(msgs))
 
     async def append_manage_user(self, event: AiocqhttpMessageEvent):
@@ -126,14 +242,17 @@ class NormalHandle:
         if not at_ids:
             yield event.plain_result("需@要添加的审批员")
             return
+        bot = self.bots.get(event)
+        lists = bot.lists
         for at_id in at_ids:
             nickname = await get_nickname(
-                client=event.bot, group_id=event.get_group_id(), user_id=at_id
+                client=bot.client, group_id=event.get_group_id(), user_id=at_id
             )
-            if self.cfg.is_manage_user(at_id):
+            if lists.is_manage_user(at_id):
                 yield event.plain_result(f"{nickname}已在审批员列表中")
                 continue
-            self.cfg.add_manage_user(at_id)
+            lists.add_manage_user(at_id)
+            bot.record("加审批员", at_id, operator=event.get_sender_id())
             yield event.plain_result(f"已添加审批员: {nickname}")
 
     async def remove_manage_user(self, event: AiocqhttpMessageEvent):
@@ -142,12 +261,82 @@ class NormalHandle:
         if not at_ids:
             yield event.plain_result("需@要移除的审批员")
             return
+        bot = self.bots.get(event)
+        lists = bot.lists
         for at_id in at_ids:
             nickname = await get_nickname(
-                client=event.bot, group_id=event.get_group_id(), user_id=at_id
+                client=bot.client, group_id=event.get_group_id(), user_id=at_id
             )
-            if not self.cfg.is_manage_user(at_id):
+            if not lists.is_manage_user(at_id):
                 yield event.plain_result(f"{nickname}不在审批员列表中")
                 continue
-            self.cfg.remove_manage_user(at_id)
+            lists.remove_manage_user(at_id)
+            bot.record("减审批员", at_id, operator=event.get_sender_id())
             yield event.plain_result(f"已移除审批员: {nickname}")
+
+    # ---------- 关系日志 ----------
+
+    async def query_journal(self, event: AiocqhttpMessageEvent):
+        """关系日志 [群号|QQ] [条数]"""
+        args = event.message_str.split()[1:]
+        target = args[0] if args else ""
+        limit = int(args[1]) if len(args) > 1 and args[1].isdigit() else 20
+        bot = self.bots.get(event)
+        records = await asyncio.to_thread(
+            bot.journal.query, target, bot=bot.self_id, limit=min(limit, 100)
+        )
+        if not records:
+            yield event.plain_result(f"没有{target or ''}相关的关系日志")
+            return
+        head = f"【关系日志】{target or '全部'}，最近 {len(records)} 条："
+        yield event.plain_result(head + "\n" + "\n".join(r.display() for r in records))
+
+    # ---------- 活跃度 ----------
+
+    async def get_activity(self, event: AiocqhttpMessageEvent):
+        """活跃度 [条数]，只用本地计数和已缓存的群列表，不调用接口"""
+        args = event.message_str.split()[1:]
+        top = int(args[0]) if args and args[0].isdigit() else 10
+        bot = self.bots.get(event)
+        activity = bot.activity
+        now = time.time()
+
+        known = {e.id: e.name for e in bot.groups.entries}
+        gids = set(known) | set(activity.group_ids())
+        if not gids:
+            yield event.plain_result("还没有任何群的活跃度数据")
+            return
+
+        ranked = sorted(gids, key=lambda g: activity.rate(g, now), reverse=True)
+
+        def line(gid: str) -> str:
+            last = activity.last_seen(gid)
+            ago = convert_duration_advanced(int(now - last)) + "前" if last else "从未"
+            return (
+                f"{known.get(gid, '')}({gid})："
+                f"{activity.rate(gid, now):.1f}条/时，"
+                f"约{activity.senders(gid)}人发言，最后发言{ago}"
+            )
+
+        hot = [line(g) for g in ranked[:top] if activity.rate(g, now) >= 0.05]
+        dead = [line(g) for g in reversed(ranked) if activity.rate(g, now) < 0.05]
+        text = f"【活跃度】统计 {len(gids)} 个群（自插件启动起）\n\n最活跃：\n"
+        text += "\n".join(hot) or "无"
+        text += f"\n\n沉寂（{len(dead)} 个）：\n" + ("\n".join(dead[:top]) or "无")
+        yield event.plain_result(text)
+
+    # ---------- 运行状态 ----------
+
+    async def get_status(self, event: AiocqhttpMessageEvent):
+        """关系状态：各账号的接口熔断状态、预热进度和各阶段超时次数"""
+        states = {"closed": "正常", "half-open": "试探中", "open": "熔断中"}
+        lines = ["【运行状态】"]
+        for bot in self.bots:
+            breaker = bot.calls.breaker
+            lines.append(
+                f"账号 {bot.self_id}：接口{states[breaker.state]}，"
+                f"连续失败 {breaker.failures} 次，预热{bot.warmup or '未开始'}"
+            )
+        lines.append("\n超时统计：")
+        lines.extend(timeouts.summary() or ["无"])
+        yield event.plain_result("\n".join(lines))
@@ -1,13 +1,12 @@
 from dataclasses import dataclass
 
-from aiocqhttp import CQHttp
-
+from ..bot import BotContext
 from ..config import PluginConfig
 from ..utils import convert_duration_advanced, get_nickname
 from .model import NoticeMessage
 
 
-@dataclass
+@dataclass(slots=True)
 class NoticeResult:
     """业务结果对象"""
 
@@ -25,13 +24,16 @@ class NoticeDecision:
 
     def __init__(
         self,
-        client: CQHttp,
+        bot: BotContext,
         message: NoticeMessage,
         config: PluginConfig,
     ):
         self.cfg = config
         self.ncfg = config.notice
-        self.client = client
+        self.bot = bot
+        self.client = bot.client
+        # 决策全程使用同一份名单快照
+        self.lists = bot.lists.snapshot()
         self.msg = message
 
         self._group_name: str | None = None
@@ -60,17 +62,18 @@ class NoticeDecision:
     # ----------------
     async def _get_group_name(self) -> str:
         if self._group_name is None:
-            info = (
-                await self.client.get_group_info(group_id=int(self.msg.group_id)) or {}
+            # 群名只用于展示，缓存值也可以接受
+            fetched = await self.client.fetch(
+                "get_group_info", group_id=self.msg.group_id
             )
-            self._group_name = info.get("group_name", "")
+            self._group_name = (fetched.value or {}).get("group_name", "")
         return self._group_name
 
     async def _get_operator_name(self) -> str:
         if self._operator_name is None:
             self._operator_name = await get_nickname(
                 self.client,
-                user_id=int(self.msg.operator_id),
+                user_id=self.msg.operator_id,
                 group_id=self.msg.group_id,
             )
         return self._operator_name
@@ -126,12 +129,12 @@ class NoticeDecision:
     async def _handle_invited(self, result: NoticeResult):
         group_name = await self._get_group_name()
         operator_name = await self._get_operator_name()
-        gid = int(self.msg.group_id)
+        gid = self.msg.group_id
 
         result.admin_reply = f"主人..我被 {operator_name} 拉进了 {group_name}({gid})。"
 
         # 审批员拉群直接放行，其余人按规则过滤
-        if self.msg.operator_id not in self.cfg.manage_users:
+        if not self.lists.is_manage_user(str(self.msg.operator_id)):
             if await self._check_blacklist(result, group_name, gid):
                 return
             if await self._check_group_size(result, gid):
@@ -150,7 +153,7 @@ class NoticeDecision:
     async def _check_blacklist(
         self, result: NoticeResult, group_name: str, gid: int
     ) -> bool:
-        if self.cfg.is_black_group(self.msg.group_id):
+        if self.lists.is_black_group(str(gid)):
             result.admin_reply += f"\n群聊 {group_name}({gid}) 在黑名单里，我退群了"
             result.operator_reply = "把我踢了还想要我回来？退了退了"
             result.leave_group = True
@@ -158,26 +161,39 @@ class NoticeDecision:
         return False
 
     async def _check_capacity(self, result: NoticeResult) -> bool:
-        group_list = await self.client.get_group_list()
+        # 刚入群，强制刷新当前账号的群列表
+        try:
+            await self.bot.groups.load(self.client, refresh=True)
+        except Exception:
+            # 旧列表不含新群，计数不可靠
+            result.admin_reply += "\n获取群列表失败，未做群容量检查"
+            return False
+        joined = len(self.bot.groups)
         max_cap = self.ncfg.max_group_capacity
 
-        if len(group_list) > max_cap:
+        if joined > max_cap:
             result.admin_reply += (
-                f"\n我已经加了{len(group_list)}个群（超过了{max_cap}个），这群我退了"
+                f"\n我已经加了{joined}个群（超过了{max_cap}个），这群我退了"
             )
-            result.operator_reply = f"我最多只能加{max_cap}个群，现在已经加了{len(group_list)}个群，请不要拉我进群了"
+            result.operator_reply = f"我最多只能加{max_cap}个群，现在已经加了{joined}个群，请不要拉我进群了"
             result.leave_group = True
             return True
         return False
 
     async def _check_mutual_blacklist(self, result: NoticeResult, gid: int) -> bool:
-        mutual = set(self.ncfg.mutual_blacklist)
-        mutual.discard(self.msg.user_id)
+        mutual = self.lists.mutual_blacklist
+        self_id = str(self.msg.user_id)
 
-        members = await self.client.get_group_member_list(group_id=int(gid))
-        member_ids = {str(m["user_id"]) for m in members}
-
-        common = member_ids & mutual
+        fetched = await self.client.fetch("get_group_member_list", group_id=gid)
+        if not fetched.ok:
+            # 成员列表不可靠时不据此退群
+            result.admin_reply += "\n获取群成员失败，未做互斥成员检查"
+            return False
+        common = {
+            uid
+            for m in fetched.value
+            if (uid := str(m["user_id"])) in mutual and uid != self_id
+        }
         if not common:
             return False
 
@@ -199,10 +215,16 @@ class NoticeDecision:
         """
         返回 True 表示已触发退群，不再继续后续检查
         """
-        group_info = (
-            await self.client.get_group_info(group_id=int(gid), no_cache=True) or {}
+        fetched = await self.client.fetch(
+            "get_group_info", group_id=gid, no_cache=True
         )
-        member_count = group_info.get("member_count", 0)
+        member_count = (fetched.value or {}).get("member_count")
+        # 拿不到实时人数时只提示，不据此退群
+        if not fetched.ok or member_count is None:
+            result.admin_reply += "\n获取群人数失败，未做群人数检查"
+            if fetched.stale and member_count is not None:
+                result.admin_reply += f"（缓存人数 {member_count}）"
+            return False
 
         # 1. 小群限制
         min_size = self.ncfg.min_group_size
@@ -1,38 +1,229 @@
 import asyncio
+import itertools
+from collections.abc import Callable
 
+from astrbot.api import logger
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..bot import BotContext, BotRegistry
 from ..config import PluginConfig
+from ..deadline import Deadline, DeadlineExceeded, timeouts
 from ..forward import ForwardTool
-from .decision import NoticeDecision
+from ..tracing import Span
+from .decision import NoticeDecision, NoticeResult
 from .model import NoticeMessage
 
+# 通知类型 -> 合并类别：同一个群里排队中的旧通知被同类新通知取代后直接跳过
+_COALESCE = {
+    "group_ban": "ban",
+    "group_admin": "admin",
+    "group_increase": "increase",
+    "group_decrease": "decrease",
+}
+# 入群 / 被踢决定了 bot 还在不在群里，之前的禁言、管理变动也随之作废；
+# 被踢还会取代排队中的入群，入群不能取代被踢（被踢要拉黑、记日志）
+_SUPERSEDES = {
+    "increase": ("increase", "ban", "admin"),
+    "decrease": ("decrease", "increase", "ban", "admin"),
+}
+
+
+class _GroupQueue:
+    """单个群的通知队列：锁保证串行处理，latest 记录各类别最新一条通知的序号"""
+
+    __slots__ = ("lock", "refs", "latest")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0
+        self.latest: dict[str, int] = {}
+
+    def mark(self, kind: str, seq: int) -> None:
+        """登记一条新通知，取代排队中的同类及被它作废的通知"""
+        for k in _SUPERSEDES.get(kind, (kind,)):
+            self.latest[k] = seq
+
+    def superseded(self, kind: str, seq: int) -> bool:
+        return self.latest.get(kind) != seq
+
 
 class NoticeHandle:
-    def __init__(self, config: PluginConfig):
+    """
+    群通知处理
+
+    - 同一账号同一群的通知排队串行处理，不同群之间完全并行
+    - 排队期间被同类新通知取代的旧通知直接跳过（如禁言后马上解禁，只处理解禁）
+    - 执行退群前再确认一次没有被取代，避免被踢后重复退群
+    - 队列锁只在决策、名单更新和退群时持有，回复和各种等待不占锁
+    - 群的队列在没有通知排队时即回收
+    """
+
+    def __init__(self, config: PluginConfig, bots: BotRegistry):
         self.cfg = config
+        self.bots = bots
+        self._queues: dict[tuple[str, int], _GroupQueue] = {}
+        self._seq = itertools.count(1)
 
     async def handle(self, event: AiocqhttpMessageEvent):
         raw = getattr(event.message_obj, "raw_message", {})
         if not isinstance(raw, dict):
             return
-        notice = NoticeMessage.from_raw(raw)
+
+        # 普通群消息只计入活跃度和消息缓冲
+        if raw.get("post_type") == "message":
+            if gid := raw.get("group_id"):
+                bot = self.bots.get(event)
+                bot.activity.observe(
+                    str(gid), str(raw.get("user_id", "")), raw.get("time")
+                )
+                if bot.messages:
+                    bot.messages.push(str(gid), raw)
+            return
+
+        trace = self.bots.tracer.start(
+            "notice", **{"onebot.self_id": str(event.get_self_id())}
+        )
+        try:
+            async for msg in self._handle_notice(event, raw, trace):
+                yield msg
+        except Exception as e:
+            trace.fail(e)
+            raise
+        finally:
+            trace.end()
+
+    async def _handle_notice(
+        self, event: AiocqhttpMessageEvent, raw: dict, trace: Span
+    ):
+        with trace.child("parse"):
+            notice = NoticeMessage.from_raw(raw)
+        trace.set(
+            notice_type=notice.notice_type,
+            sub_type=notice.sub_type,
+            group_id=notice.group_id,
+        )
+
+        # 群成员变动：记下来供巡检复查互斥成员
+        if notice.notice_type in ("group_increase", "group_decrease"):
+            self.bots.get(event).dirty_groups.add(str(notice.group_id))
 
         if not notice.is_self_notice():
             return
 
-        decision = NoticeDecision(event.bot, notice, self.cfg)
-        result = await decision.decide()
+        bot = self.bots.get(event)
+        key = (bot.self_id, notice.group_id)
+        kind = _COALESCE.get(notice.notice_type, notice.notice_type)
+        seq = next(self._seq)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _GroupQueue()
+        queue.mark(kind, seq)
+        queue.refs += 1
 
-        # 操作者提示
-        if result.operator_reply:
-            yield event.plain_result(result.operator_reply)
+        def superseded() -> bool:
+            return queue.superseded(kind, seq)
+
+        try:
+            # 锁只覆盖决策和名单更新；回复、延迟查群、退群前的等待都在锁外，
+            # 不让同群后面的通知陪着等
+            async with queue.lock:
+                if superseded():
+                    logger.debug(
+                        f"群({notice.group_id})的{notice.notice_type}通知已被取代，跳过"
+                    )
+                    trace.set(coalesced=True)
+                    event.stop_event()
+                    return
+                result = await self._decide(bot, notice, trace)
+            if result is None:
+                event.stop_event()
+                return
+            async for msg in self._follow_up(
+                event, bot, notice, trace, result, queue.lock, superseded
+            ):
+                yield msg
+        finally:
+            queue.refs -= 1
+            if not queue.refs:
+                del self._queues[key]
+
+    async def _decide(
+        self, bot: BotContext, notice: NoticeMessage, trace: Span
+    ) -> NoticeResult | None:
+        """决策并更新名单（在群队列锁内执行），决策超时返回 None"""
+        client = bot.client
+        deadline = Deadline("notice", self.cfg.timeout, timeouts, trace)
+        decision = NoticeDecision(bot, notice, self.cfg)
+        try:
+            result = await deadline.run(
+                "decide", decision.decide(), self.cfg.timeout * 2 / 3
+            )
+        except DeadlineExceeded:
+            # 决策没完成时不做任何自动处置，只告知管理员
+            bot.groups.invalidate()
+            await ForwardTool.send_admin(
+                client,
+                self.cfg,
+                f"群({notice.group_id})的{notice.notice_type}通知处理超时，未自动处理",
+            )
+            return None
+
+        # 入群 / 被踢 / 退群 都会改变群列表
+        if notice.notice_type in ("group_increase", "group_decrease"):
+            bot.groups.invalidate()
+        # 记下入群 / 被踢 / 群解散，巡检对比列表快照时据此区分
+        if notice.notice_type == "group_increase":
+            bot.record("入群", notice.group_id, operator=notice.operator_id)
+        elif notice.sub_type == "kick_me":
+            bot.record("被踢出群", notice.group_id, operator=notice.operator_id)
+        elif notice.sub_type == "disband":
+            bot.record("群解散", notice.group_id, operator=notice.operator_id)
 
         # 管理者提示
         if result.admin_reply:
-            await ForwardTool.send_admin(event, self.cfg, result.admin_reply)
+            try:
+                await deadline.run(
+                    "notify",
+                    ForwardTool.send_admin(client, self.cfg, result.admin_reply),
+                )
+            except DeadlineExceeded:
+                pass
+
+        reason = result.admin_reply.rsplit("\n", 1)[-1]
+
+        # 拉黑群聊
+        if result.black_group:
+            with trace.child("black_group"):
+                bot.lists.add_black_group(notice.group_id)
+                bot.record("拉黑群", notice.group_id, operator="auto", reason=reason)
+
+        # 拉黑用户
+        if result.black_user:
+            with trace.child("block_user"):
+                bot.lists.add_block_user(notice.operator_id)
+                bot.record(
+                    "拉黑用户", notice.operator_id, operator="auto", reason=reason
+                )
+        return result
+
+    async def _follow_up(
+        self,
+        event: AiocqhttpMessageEvent,
+        bot: BotContext,
+        notice: NoticeMessage,
+        trace: Span,
+        result: NoticeResult,
+        lock: asyncio.Lock,
+        superseded: Callable[[], bool],
+    ):
+        """锁外的后续动作：回复操作者、查群、退群（退群本身重新进锁）"""
+        client = bot.client
+
+        # 操作者提示
+        if result.operator_reply:
+            yield event.plain_result(result.operator_reply)
 
         # 查群
         if (
@@ -43,29 +234,58 @@ class NoticeHandle:
             # 延迟
             if self.cfg.check.delay > 0:
                 await asyncio.sleep(self.cfg.check.delay)
-            # 转发
+            # 转发（延迟之后单独计时）
             fgid = int(self.cfg.manage_group) if self.cfg.manage_group else None
             fuid = int(self.cfg.admin_id) if self.cfg.admin_id else None
-            await ForwardTool.source_forward(
-                client=event.bot,
-                count=self.cfg.check.count,
-                source_group_id=int(event.get_group_id()),
-                source_user_id=int(event.get_sender_id()),
-                forward_group_id=fgid,
-                forward_user_id=fuid,
-            )
-
-        # 拉黑群聊
-        if result.black_group:
-            self.cfg.add_black_group(notice.group_id)
-
-        # 拉黑用户
-        if result.black_user:
-            self.cfg.add_block_user(notice.user_id)
+            try:
+                await Deadline("notice", self.cfg.timeout, timeouts, trace).run(
+                    "forward",
+                    ForwardTool.source_forward(
+                        client=client,
+                        buffer=bot.messages,
+                        count=self.cfg.check.count,
+                        source_group_id=int(event.get_group_id()),
+                        source_user_id=int(event.get_sender_id()),
+                        forward_group_id=fgid,
+                        forward_user_id=fuid,
+                    ),
+                )
+            except DeadlineExceeded:
+                pass
 
         # 退群
         if result.leave_group:
             await asyncio.sleep(5)
-            await event.bot.set_group_leave(group_id=int(notice.group_id))
+            async with lock:
+                if superseded():
+                    # 等待期间已被踢出或已解禁
+                    logger.info(f"群({notice.group_id})状态已变化，取消自动退群")
+                    event.stop_event()
+                    return
+                await self._leave(bot, notice, trace, result)
 
         event.stop_event()
+
+    async def _leave(
+        self,
+        bot: BotContext,
+        notice: NoticeMessage,
+        trace: Span,
+        result: NoticeResult,
+    ) -> None:
+        reason = result.admin_reply.rsplit("\n", 1)[-1]
+        try:
+            await Deadline("notice", self.cfg.timeout, timeouts, trace).run(
+                "leave", bot.client.set_group_leave(group_id=notice.group_id)
+            )
+            bot.record("退群", notice.group_id, operator="auto", reason=reason)
+        except Exception as e:
+            bot.record(
+                "退群",
+                notice.group_id,
+                operator="auto",
+                reason=reason,
+                outcome=f"失败: {e}",
+            )
+            raise
+        bot.groups.invalidate()
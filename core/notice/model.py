@@ -1,18 +1,21 @@
 from dataclasses import dataclass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NoticeMessage:
-    """Notice 消息模型"""
+    """
+    Notice 消息模型
+    ID 一律存为 int，只在写入名单等字符串存储时再转换
+    """
 
     post_type: str
     notice_type: str
     sub_type: str
 
-    user_id: str
-    self_id: str
-    group_id: str
-    operator_id: str
+    user_id: int
+    self_id: int
+    group_id: int
+    operator_id: int
 
     duration: int = 0
 
@@ -22,11 +25,11 @@ class NoticeMessage:
             post_type=raw.get("post_type", ""),
             notice_type=raw.get("notice_type", ""),
             sub_type=raw.get("sub_type", ""),
-            user_id=str(raw.get("user_id", "")),
-            self_id=str(raw.get("self_id", "")),
-            group_id=str(raw.get("group_id", "")),
-            operator_id=str(raw.get("operator_id", "")),
-            duration=int(raw.get("duration", 0)),
+            user_id=int(raw.get("user_id") or 0),
+            self_id=int(raw.get("self_id") or 0),
+            group_id=int(raw.get("group_id") or 0),
+            operator_id=int(raw.get("operator_id") or 0),
+            duration=int(raw.get("duration") or 0),
         )
 
     def is_self_notice(self) -> bool:
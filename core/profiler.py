@@ -0,0 +1,169 @@
+import asyncio
+import gc
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+
+from astrbot.api import logger
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+# 参与统计的源码（相对插件根目录）
+TARGETS = ("core/notice/", "core/request/", "core/forward.py", "core/utils.py")
+
+
+class SamplingProfiler:
+    """
+    按需开启的采样剖析器，关闭时不挂任何钩子、不占任何开销
+
+    - CPU 采样：后台线程定时读取事件循环线程的当前栈，按占用比例汇总
+    - 等待采样：事件循环内定时遍历所有任务的协程链，按平均挂起的协程数汇总
+    - 两类样本分别以 [cpu] / [wait] 为根，写成 flamegraph.pl 可用的折叠栈
+    - 只保留 TARGETS 内的栈帧，标签为 相对路径:函数名
+    """
+
+    def __init__(self, out_dir: Path, interval: float = 0.005):
+        self.out_dir = out_dir
+        self.interval = interval
+        self._labels: dict[CodeType, str | None] = {}
+        self._stacks: Counter[str] = Counter()
+        self._samples = {"cpu": 0, "wait": 0}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    # -------------------------
+    # 栈帧处理
+    # -------------------------
+    def _label(self, code: CodeType) -> str | None:
+        label = self._labels.get(code, "")
+        if label != "":
+            return label
+        label = None
+        try:
+            rel = Path(code.co_filename).resolve().relative_to(PLUGIN_ROOT).as_posix()
+        except ValueError:
+            rel = ""
+        if rel.startswith(TARGETS):
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{rel}:{name}"
+        self._labels[code] = label
+        return label
+
+    def _frame_stack(self, frame: FrameType | None) -> list[str]:
+        """线程栈，内层在前"""
+        stack = []
+        while frame is not None:
+            if label := self._label(frame.f_code):
+                stack.append(label)
+            frame = frame.f_back
+        return stack
+
+    def _task_stack(self, task: asyncio.Task) -> list[str]:
+        """沿 cr_await 链展开协程，外层在前"""
+        stack: list[str] = []
+        obj = task.get_coro()
+        for _ in range(64):
+            if obj is None:
+                break
+            frame = getattr(obj, "cr_frame", None) or getattr(obj, "ag_frame", None)
+            if frame is not None:
+                if label := self._label(frame.f_code):
+                    stack.append(label)
+                obj = getattr(obj, "cr_await", None) or getattr(obj, "ag_await", None)
+                continue
+            # async for 等待的是 asend 包装对象，从引用里找回异步生成器
+            obj = next(
+                (r for r in gc.get_referents(obj) if hasattr(r, "ag_frame")), None
+            )
+        return stack
+
+    def _add(self, kind: str, stack: list[str]) -> None:
+        if stack:
+            key = ";".join([f"[{kind}]", *stack])
+            with self._lock:
+                self._stacks[key] += 1
+
+    # -------------------------
+    # 采样
+    # -------------------------
+    def _cpu_sampler(self, thread_id: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            self._samples["cpu"] += 1
+            self._add("cpu", self._frame_stack(frame)[::-1])
+
+    async def _wait_sampler(self) -> None:
+        me = asyncio.current_task()
+        while not self._stop.is_set():
+            self._samples["wait"] += 1
+            for task in asyncio.all_tasks():
+                if task is not me:
+                    self._add("wait", self._task_stack(task))
+            await asyncio.sleep(self.interval * 4)
+
+    async def run(self, seconds: float, top: int = 10) -> str:
+        """采样 seconds 秒，写出折叠栈文件并返回摘要"""
+        if self._running:
+            return "已有剖析在进行中"
+        self._running = True
+        self._stop.clear()
+        self._stacks.clear()
+        self._samples = {"cpu": 0, "wait": 0}
+        thread = threading.Thread(
+            target=self._cpu_sampler,
+            args=(threading.get_ident(),),
+            name="relationship-profiler",
+            daemon=True,
+        )
+        started = time.monotonic()
+        thread.start()
+        waiter = asyncio.create_task(self._wait_sampler())
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._stop.set()
+            thread.join()
+            await waiter
+            self._running = False
+        elapsed = time.monotonic() - started
+        path = self._dump()
+        return self._summary(elapsed, top) + f"\n\n折叠栈已写入：{path}"
+
+    # -------------------------
+    # 输出
+    # -------------------------
+    def _dump(self) -> Path:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"剖析结果已写入 {path}")
+        return path
+
+    def _summary(self, elapsed: float, top: int) -> str:
+        # 包含时间：一个样本内同一函数只计一次
+        inclusive: dict[str, Counter[str]] = {"cpu": Counter(), "wait": Counter()}
+        for stack, count in self._stacks.items():
+            kind, *frames = stack.split(";")
+            for label in set(frames):
+                inclusive[kind.strip("[]")][label] += count
+
+        lines = [f"【性能剖析】{elapsed:.0f} 秒"]
+        for kind, title in (("cpu", "占用 CPU 比例"), ("wait", "平均挂起协程数")):
+            total = self._samples[kind]
+            lines.append(f"\n{title}（{total} 次采样）：")
+            if not total or not inclusive[kind]:
+                lines.append("无")
+                continue
+            for label, n in inclusive[kind].most_common(top):
+                value = f"{n / total:6.1%}" if kind == "cpu" else f"{n / total:6.2f}"
+                lines.append(f"{value}  {label}")
+        return "\n".join(lines)
@@ -1,12 +1,12 @@
 from dataclasses import dataclass
 
-from aiocqhttp import CQHttp
-
+from ..bot import BotContext
+from ..capability import capabilities
 from ..config import PluginConfig
 from .model import BaseRequest, FriendRequest, GroupRequest
 
 
-@dataclass
+@dataclass(slots=True)
 class RequestResult:
     admin_reply: str = ""
     user_reply: str = ""
@@ -14,6 +14,7 @@ class RequestResult:
     approve: bool | None = None
     block_group: bool | None = None
     block_user: bool | None = None
+    rule: str = ""
 
 
 class RequestDecision:
@@ -21,11 +22,14 @@ class RequestDecision:
 
     def __init__(
         self,
-        client: CQHttp,
+        bot: BotContext,
         request: BaseRequest,
         config: PluginConfig,
     ):
-        self.client = client
+        self.bot = bot
+        self.client = bot.client
+        # 决策全程使用同一份名单快照
+        self.lists = bot.lists.snapshot()
         self.req = request
         self.cfg = config
 
@@ -80,14 +84,18 @@ class RequestDecision:
                 return True
 
             # 2. 用户黑名单
-            if uid in cfg.user_blacklist:
+            if self.lists.is_block_user(uid):
                 result.approve = False
                 result.user_reply = "你已被加入黑名单，无法添加好友"
                 result.block_user = True
                 result.admin_reply += "\n自动处理：该用户在黑名单中"
                 return True
 
-            # 3. 自动同意
+            # 3. 申请规则
+            if self._apply_rule(result):
+                return True
+
+            # 4. 自动同意
             if cfg.auto_agree_friend:
                 result.approve = True
                 result.user_reply = "已自动同意好友请求"
@@ -106,14 +114,18 @@ class RequestDecision:
                 return True
 
             # 2. 群黑名单
-            if gid in cfg.group_blacklist:
+            if self.lists.is_black_group(gid):
                 result.approve = False
                 result.user_reply = "该群已被列入黑名单，自动拒绝"
                 result.block_group = True
                 result.admin_reply += "\n自动处理：该群在黑名单中"
                 return True
 
-            # 3. 自动同意
+            # 3. 申请规则
+            if self._apply_rule(result):
+                return True
+
+            # 4. 自动同意
             if cfg.auto_agree_group:
                 result.approve = True
                 result.user_reply = "已自动同意群邀请"
@@ -122,16 +134,40 @@ class RequestDecision:
 
         return False
 
+    def _apply_rule(self, result: RequestResult) -> bool:
+        """按验证信息和 ID 区间匹配申请规则"""
+        req = self.req
+        is_group = isinstance(req, GroupRequest)
+        rule = self.cfg.request.engine.match(
+            "group" if is_group else "friend",
+            req.comment,
+            req.requester_id,
+            req.group_id if is_group else 0,
+        )
+        if not rule:
+            return False
+
+        result.rule = rule.display()
+        noun = "群邀请" if is_group else "好友请求"
+        if rule.action == "同意":
+            result.approve = True
+            result.user_reply = f"已自动同意{noun}"
+        else:
+            result.approve = False
+            result.user_reply = f"已自动拒绝{noun}"
+            if rule.action == "拉黑":
+                if is_group:
+                    result.block_group = True
+                else:
+                    result.block_user = True
+        result.admin_reply += f"\n自动处理：{rule.action}，命中规则 {result.rule}"
+        return True
+
     # ======================================================
     # Afdian 校验
     # ======================================================
     def _check_afdian(self) -> bool:
-        try:
-            from ...afdian import afdian_verify
-
-            return afdian_verify(remark=str(self.req.requester_id))
-        except ImportError:
-            return False
+        return capabilities.afdian_verify(str(self.req.requester_id))
 
     # ======================================================
     # 原有业务逻辑（未自动处理时）
@@ -161,7 +197,7 @@ class RequestDecision:
         else:
             result.user_reply = "群邀请已收到，需要审核通过后才能加入"
 
-        if self.cfg.is_black_group(req.group_id):
+        if self.lists.is_black_group(str(req.group_id)):
             result.admin_reply += "\n警告: 该群为黑名单群聊，请谨慎通过"
             result.user_reply += "\n该群已被列入黑名单，可能不会通过审核"
 
@@ -176,10 +212,9 @@ class RequestDecision:
         extra: str = "",
         block: bool = False,
     ):
-        friend_list = await self.client.get_friend_list()
-        uids = {str(f["user_id"]) for f in friend_list}
+        await self.bot.friends.load(self.client, refresh=True)
 
-        if req.user_id in uids:
+        if self.bot.friends.get(req.user_id):
             result.event_reply = f"【{req.nickname}】已经是我的好友啦"
             result.approve = None
             return
@@ -206,10 +241,9 @@ class RequestDecision:
         extra: str = "",
         block: bool = False,
     ):
-        group_list = await self.client.get_group_list()
-        gids = {str(g["group_id"]) for g in group_list}
+        await self.bot.groups.load(self.client, refresh=True)
 
-        if str(req.group_id) in gids:
+        if self.bot.groups.get(req.group_id):
             result.event_reply = f"我已经在【{req.group_name}】里啦"
             result.approve = None
             return
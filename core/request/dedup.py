@@ -0,0 +1,93 @@
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from astrbot.api import logger
+
+
+class RequestDeduper:
+    """
+    重复投递的好友申请 / 群邀请去重
+
+    - 同时按 flag 和 (类型, 申请人, 群) 识别重复，任一命中即视为重复
+    - 只在 window 秒内有效，最多保留 capacity 条，超出按时间淘汰
+    - 快照写入插件数据目录，重启后继续生效
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        window: float = 600.0,
+        capacity: int = 4096,
+        save_interval: float = 30.0,
+    ):
+        self.path = path
+        self.window = window
+        self.capacity = capacity
+        self.save_interval = save_interval
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._saved_at = 0.0
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def keys(self_id: str, raw: dict) -> tuple[str, ...]:
+        """从原始事件直接取去重键，不做任何接口调用"""
+        kind = raw.get("request_type", "")
+        keys = [f"{self_id}:{kind}:{raw.get('user_id', '')}:{raw.get('group_id', '')}"]
+        if flag := raw.get("flag"):
+            keys.append(f"{self_id}:flag:{flag}")
+        return tuple(keys)
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            key, ts = next(iter(self._seen.items()))
+            if now - ts < self.window and len(self._seen) <= self.capacity:
+                break
+            self._seen.popitem(last=False)
+
+    def seen(self, self_id: str, raw: dict) -> bool:
+        """已处理过则返回 True，否则登记并返回 False"""
+        now = time.time()
+        self._expire(now)
+        keys = self.keys(self_id, raw)
+        if any(key in self._seen for key in keys):
+            return True
+        for key in keys:
+            self._seen[key] = now
+        self._dirty = True
+        if now - self._saved_at >= self.save_interval:
+            self.save()
+        return False
+
+    # -------------------------
+    # 快照
+    # -------------------------
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            rows = json.loads(self.path.read_text("utf-8"))
+        except Exception as e:
+            logger.warning(f"读取申请去重快照失败: {e}")
+            return
+        now = time.time()
+        for key, ts in sorted(rows, key=lambda r: r[1]):
+            if now - ts < self.window:
+                self._seen[key] = ts
+
+    def save(self) -> None:
+        self._saved_at = time.time()
+        if not self._dirty:
+            return
+        self._expire(self._saved_at)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            rows = [[k, round(ts, 1)] for k, ts in self._seen.items()]
+            tmp.write_text(json.dumps(rows, separators=(",", ":")), "utf-8")
+            tmp.replace(self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"保存申请去重快照失败: {e}")
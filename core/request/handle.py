@@ -1,20 +1,32 @@
-from aiocqhttp import CQHttp
+from collections import defaultdict
 
 from astrbot.api import logger
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..bot import BotContext, BotRegistry
 from ..config import PluginConfig
+from ..deadline import Deadline, DeadlineExceeded, timeouts
 from ..forward import ForwardTool
 from ..utils import get_reply_text
-from .decision import RequestDecision
+from ..tracing import Span
+from .decision import RequestDecision, RequestResult
+from .dedup import RequestDeduper
 from .model import BaseRequest, FriendRequest, GroupRequest
+from .route import RouteCache
 
 
 class RequestHandle:
-    def __init__(self, config: PluginConfig):
+    def __init__(self, config: PluginConfig, bots: BotRegistry):
         self.cfg = config
+        self.bots = bots
+        self.dedup = RequestDeduper(bots.data_dir / "request_seen.json")
+        # 每个账号一份：bot 是否在群里、是否是好友因账号而异
+        self.routes: defaultdict[str, RouteCache] = defaultdict(RouteCache)
+
+    def close(self) -> None:
+        self.dedup.save()
 
     async def handle_cmd(
         self,
@@ -24,8 +36,9 @@ class RequestHandle:
         block: bool = False,
     ):
         """处理好友申请或群邀请"""
+        bot = self.bots.get(event)
         sender_id = event.get_sender_id()
-        if not self.cfg.is_manage_user(sender_id):
+        if not bot.lists.is_manage_user(sender_id):
             yield event.plain_result("你没权限")
             return
         text = get_reply_text(event)
@@ -33,57 +46,203 @@ class RequestHandle:
         if not req:
             yield event.plain_result("无法解析申请信息，请确保引用的是正确的申请消息")
             return
-        async for msg in self._handle_req(
-            event,
-            req,
-            approve=approve,
-            extra=extra,
-            block=block,
-        ):
-            yield msg
+        trace = self.bots.tracer.start(
+            "request.command",
+            **{"onebot.self_id": bot.self_id, "approve": approve, "block": block},
+        )
+        deadline = Deadline("request", self.cfg.timeout, timeouts, trace)
+        try:
+            async for msg in self._handle_req(
+                event,
+                bot,
+                req,
+                approve=approve,
+                extra=extra,
+                block=block,
+                deadline=deadline,
+            ):
+                yield msg
+        except Exception as e:
+            trace.fail(e)
+            raise
+        finally:
+            trace.end()
 
     async def handle_raw(self, event: AiocqhttpMessageEvent):
         raw = getattr(event.message_obj, "raw_message", None)
-        req = await BaseRequest.from_raw(event.bot, raw)
+        if not isinstance(raw, dict) or raw.get("post_type") != "request":
+            return
+        trace = self.bots.tracer.start(
+            "request",
+            **{
+                "onebot.self_id": str(event.get_self_id()),
+                "request_type": raw.get("request_type", ""),
+            },
+        )
+        try:
+            async for msg in self._handle_raw(event, raw, trace):
+                yield msg
+        except Exception as e:
+            trace.fail(e)
+            raise
+        finally:
+            trace.end()
+
+    async def _handle_raw(self, event: AiocqhttpMessageEvent, raw: dict, trace: Span):
+        # 重复投递的申请在查询资料之前就丢弃
+        if self.dedup.seen(str(event.get_self_id()), raw):
+            logger.debug(f"忽略重复投递的申请: {raw.get('flag')}")
+            trace.set(duplicate=True)
+            event.stop_event()
+            return
+        bot = self.bots.get(event)
+        deadline = Deadline("request", self.cfg.timeout, timeouts, trace)
+        try:
+            # 资料查询超时会退回默认值，这里只兜底整个阶段被取消的情况
+            req = await deadline.run(
+                "enrich",
+                BaseRequest.from_raw(bot.client, raw),
+                self.cfg.timeout / 3,
+            )
+        except DeadlineExceeded:
+            # 资料没查完也不能丢：只用原始事件里的 ID 构造，转人工审批
+            logger.warning(f"申请 {raw.get('flag')} 资料查询超时，转人工审批")
+            if req := await BaseRequest.from_raw_ids(raw):
+                await self._to_manual(bot, req, "资料查询超时，请人工审批")
+            return
         if not req:
             return
-        async for msg in self._handle_req(event, req):
+        async for msg in self._handle_req(event, bot, req, deadline=deadline):
             yield msg
 
     async def _handle_req(
         self,
         event: AiocqhttpMessageEvent,
+        bot: BotContext,
         req: BaseRequest,
         approve: bool | None = None,
         extra: str = "",
         block: bool = False,
+        deadline: Deadline | None = None,
     ):
-        decision = RequestDecision(event.bot, req, self.cfg)
-        result = await decision.decide(approve=approve, extra=extra, block=block)
+        deadline = deadline or Deadline("request", self.cfg.timeout, timeouts)
+        decision = RequestDecision(bot, req, self.cfg)
+        try:
+            result = await deadline.run(
+                "decide",
+                decision.decide(approve=approve, extra=extra, block=block),
+                deadline.remaining() / 2,
+            )
+        except DeadlineExceeded:
+            # 决策没完成：自动流程转人工，指令流程提示重试
+            if approve is None:
+                await self._to_manual(bot, req, "自动处理超时，请人工审批")
+            else:
+                yield event.plain_result("处理超时，请稍后重试")
+            return
+        operator = event.get_sender_id() if approve is not None else "auto"
+        # 自动处理时以命中的规则作为理由
+        reason = extra or result.rule
 
+        done = True
         if result.approve is not None:
-            await self._do_approve(event.bot, req, result.approve)
+            try:
+                await deadline.run(
+                    "approve",
+                    self._do_approve(bot, req, result.approve, operator, reason),
+                    deadline.remaining() / 2,
+                )
+            except DeadlineExceeded:
+                done = False
+                action, target = self._approve_record(req, result.approve)
+                bot.record(
+                    action, target, operator=operator, reason=reason, outcome="超时"
+                )
+            if result.approve:
+                # 列表即将变化
+                bot.groups.invalidate()
+                bot.friends.invalidate()
+
+        # 待审批申请：自动规则未处理（或审批超时）的入表，审批员处理过的出表
+        if approve is None and (result.approve is None or not done):
+            bot.add_pending(req)
+        elif done:
+            bot.pop_pending(req.flag)
 
         if result.event_reply:
             yield event.plain_result(result.event_reply)
 
-        if result.user_reply:
-            await self._send_user_reply(event, req, result.user_reply)
+        # 通知失败不影响后续的名单更新
+        try:
+            if result.user_reply:
+                await deadline.run(
+                    "reply",
+                    self._send_user_reply(event, bot, req, result.user_reply),
+                    deadline.remaining() / 2,
+                )
+            if result.admin_reply and approve is None:
+                await deadline.run(
+                    "notify",
+                    ForwardTool.send_admin(bot.client, self.cfg, result.admin_reply),
+                )
+        except DeadlineExceeded:
+            pass
 
-        if result.admin_reply and approve is None:
-            await ForwardTool.send_admin(event, self.cfg, result.admin_reply)
+        with deadline.trace.child("lists"):
+            self._update_lists(bot, req, result, operator, reason)
 
-        if result.block_group is False and isinstance(req, GroupRequest):
-            self.cfg.remove_black_group(req.group_id)
-        elif result.block_group and isinstance(req, GroupRequest):
-            self.cfg.add_black_group(req.group_id)
+    async def _to_manual(self, bot: BotContext, req: BaseRequest, note: str) -> None:
+        """跳过自动规则，直接转人工审批"""
+        bot.add_pending(req)
+        await ForwardTool.send_admin(
+            bot.client, self.cfg, f"{req.to_display_text()}\n{note}"
+        )
 
-        if result.block_user is False and isinstance(req, FriendRequest):
-            self.cfg.remove_block_user(req.user_id)
-        elif result.block_user and isinstance(req, FriendRequest):
-            self.cfg.add_block_user(req.user_id)
+    @staticmethod
+    def _update_lists(
+        bot: BotContext,
+        req: BaseRequest,
+        result: RequestResult,
+        operator: str,
+        reason: str,
+    ) -> None:
+        lists = bot.lists
+        if isinstance(req, GroupRequest):
+            gid = str(req.group_id)
+            if result.block_group is False and lists.is_black_group(gid):
+                lists.remove_black_group(gid)
+                bot.record("解除拉黑群", gid, operator=operator, reason=reason)
+            elif result.block_group and not lists.is_black_group(gid):
+                lists.add_black_group(gid)
+                bot.record("拉黑群", gid, operator=operator, reason=reason)
+
+        if isinstance(req, FriendRequest):
+            uid = str(req.user_id)
+            if result.block_user is False and lists.is_block_user(uid):
+                lists.remove_block_user(uid)
+                bot.record("解除拉黑用户", uid, operator=operator, reason=reason)
+            elif result.block_user and not lists.is_block_user(uid):
+                lists.add_block_user(uid)
+                bot.record("拉黑用户", uid, operator=operator, reason=reason)
 
-    async def _do_approve(self, client: CQHttp, req: BaseRequest, approve: bool):
+    @staticmethod
+    def _approve_record(req: BaseRequest, approve: bool) -> tuple[str, int]:
+        """审批操作在关系日志中的动作名和目标"""
+        if isinstance(req, GroupRequest):
+            return ("同意群邀请" if approve else "拒绝群邀请"), req.group_id
+        return ("同意好友" if approve else "拒绝好友"), req.requester_id
+
+    async def _do_approve(
+        self,
+        bot: BotContext,
+        req: BaseRequest,
+        approve: bool,
+        operator: str = "",
+        reason: str = "",
+    ):
+        client = bot.client
+        action, target = self._approve_record(req, approve)
+        outcome = "成功"
         try:
             if isinstance(req, FriendRequest):
                 await client.set_friend_add_request(flag=req.flag, approve=approve)
@@ -92,36 +251,43 @@ class RequestHandle:
                     flag=req.flag, sub_type="invite", approve=approve
                 )
         except Exception as e:
+            outcome = f"失败: {e}"
             logger.error(f"审批失败: {e}")
+        bot.record(action, target, operator=operator, reason=reason, outcome=outcome)
 
     async def _send_user_reply(
         self,
         event: AiocqhttpMessageEvent,
+        bot: BotContext,
         req: BaseRequest,
         text: str,
     ):
-        async def _try(coro):
+        """按 群 -> 私聊 -> 当前会话 的顺序投递，跳过已知走不通的路线"""
+        cache = self.routes[bot.self_id]
+        routes: list[tuple[str, int]] = []
+        if isinstance(req, GroupRequest):
+            # 群邀请处理时 bot 通常还没进群，群列表新鲜且不含该群时直接跳过
+            if bot.groups.is_fresh() and not bot.groups.get(req.group_id):
+                cache.mark("group", req.group_id, "not_member")
+            routes.append(("group", req.group_id))
+            routes.append(("private", req.inviter_id))
+            key = f"group:{req.group_id}:{req.inviter_id}"
+        else:
+            routes.append(("private", req.requester_id))
+            key = f"friend:{req.requester_id}"
+        routes.append(("event", 0))
+
+        for route, target in cache.order(key, routes):
             try:
-                await coro
-                return True
+                if route == "group":
+                    await bot.client.send_group_msg(group_id=target, message=text)
+                elif route == "private":
+                    await bot.client.send_private_msg(user_id=target, message=text)
+                else:
+                    await event.send(event.plain_result(text))
             except Exception as e:
-                logger.warning(f"消息发送失败: {e}")
-                return False
-
-        if isinstance(req, FriendRequest):
-            if await _try(
-                event.bot.send_private_msg(user_id=int(req.user_id), message=text)
-            ):
-                return
-            await _try(event.send(event.plain_result(text)))
-
-        elif isinstance(req, GroupRequest):
-            if await _try(
-                event.bot.send_group_msg(group_id=int(req.group_id), message=text)
-            ):
-                return
-            if await _try(
-                event.bot.send_private_msg(user_id=int(req.inviter_id), message=text)
-            ):
-                return
-            await _try(event.send(event.plain_result(text)))
+                logger.warning(f"消息发送失败({route}): {e}")
+                cache.failed(route, target, e)
+                continue
+            cache.succeeded(key, route)
+            return
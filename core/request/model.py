@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import ClassVar, Optional
 
+from ..resilience import Fetched
+
 # ==========================================================
 # BaseRequest
 # ==========================================================
@@ -12,10 +14,19 @@ class BaseRequest(ABC):
     申请基类
     - 统一 display / parse / raw 构造
     - 调用方不需要区分好友 / 群
+    - 子类为 slots dataclass，QQ 号 / 群号存为 int，调用接口时无需再转换
     """
 
+    __slots__ = ()
+
     _HEADER: ClassVar[str]
     _FIELD_MAP: ClassVar[dict[str, str]]
+    # 类名 -> 子类；dataclass(slots=True) 会重建类，按类名登记保证取到最终的类
+    _KINDS: ClassVar[dict[str, type["BaseRequest"]]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        BaseRequest._KINDS[cls.__name__] = cls
 
     # -------------------------
     # 展示
@@ -31,7 +42,7 @@ class BaseRequest(ABC):
     # -------------------------
     @classmethod
     def from_display_text(cls, text: str) -> Optional["BaseRequest"]:
-        for sub in cls.__subclasses__():
+        for sub in cls._KINDS.values():
             req = sub._from_display_text(text)
             if req:
                 return req
@@ -42,14 +53,22 @@ class BaseRequest(ABC):
         if cls._HEADER not in text:
             return None
 
+        types = {f.name: f.type for f in fields(cls)}  # type: ignore[arg-type]
         kwargs = {}
         for line in text.splitlines():
             if "：" not in line:
                 continue
             key, _, val = line.partition("：")
             field = cls._FIELD_MAP.get(key.strip())
-            if field:
-                kwargs[field] = val.strip()
+            if not field:
+                continue
+            val = val.strip()
+            if types[field] is int:
+                if not val.isdigit():
+                    return None
+                kwargs[field] = int(val)
+            else:
+                kwargs[field] = val
 
         required = set(cls._FIELD_MAP.values()) - {"comment"}
         if not required <= kwargs.keys():
@@ -66,12 +85,17 @@ class BaseRequest(ABC):
         if not isinstance(raw, dict):
             return None
 
-        for sub in cls.__subclasses__():
+        for sub in cls._KINDS.values():
             req = await sub._from_raw(client, raw)
             if req:
                 return req
         return None
 
+    @classmethod
+    async def from_raw_ids(cls, raw) -> Optional["BaseRequest"]:
+        """只用原始事件里的 ID 构造，昵称 / 群名取占位值（资料查询超时时兜底）"""
+        return await cls.from_raw(_NoLookup(), raw)
+
     @classmethod
     @abstractmethod
     async def _from_raw(cls, client, raw: dict) -> Optional["BaseRequest"]:
@@ -82,20 +106,27 @@ class BaseRequest(ABC):
     # -------------------------
     @property
     @abstractmethod
-    def requester_id(self) -> str:
+    def requester_id(self) -> int:
         """发起申请的人 ID"""
         raise NotImplementedError
 
 
+class _NoLookup:
+    """不查询任何资料的客户端，所有查询都当作失败"""
+
+    async def fetch(self, action: str, **params) -> Fetched:
+        return Fetched()
+
+
 # ==========================================================
 # FriendRequest
 # ==========================================================
 
 
-@dataclass
+@dataclass(slots=True)
 class FriendRequest(BaseRequest):
     nickname: str
-    user_id: str
+    user_id: int
     flag: str
     comment: str
 
@@ -108,7 +139,7 @@ class FriendRequest(BaseRequest):
     }
 
     @property
-    def requester_id(self) -> str:
+    def requester_id(self) -> int:
         return self.user_id
 
     @classmethod
@@ -118,12 +149,13 @@ class FriendRequest(BaseRequest):
         ):
             return None
 
-        user_id = raw.get("user_id", 0)
-        info = await client.get_stranger_info(user_id=int(user_id)) or {}
+        user_id = int(raw.get("user_id") or 0)
+        info = (await client.fetch("get_stranger_info", user_id=user_id)).value
+        info = info or {}
 
         return cls(
             nickname=info.get("nickname") or "未知昵称",
-            user_id=str(user_id),
+            user_id=user_id,
             flag=raw.get("flag", ""),
             comment=raw.get("comment") or "无",
         )
@@ -134,12 +166,12 @@ class FriendRequest(BaseRequest):
 # ==========================================================
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupRequest(BaseRequest):
     inviter_nickname: str
-    inviter_id: str
+    inviter_id: int
     group_name: str
-    group_id: str
+    group_id: int
     flag: str
     comment: str
 
@@ -154,7 +186,7 @@ class GroupRequest(BaseRequest):
     }
 
     @property
-    def requester_id(self) -> str:
+    def requester_id(self) -> int:
         return self.inviter_id
 
     @classmethod
@@ -166,17 +198,20 @@ class GroupRequest(BaseRequest):
         ):
             return None
 
-        inviter_id = raw.get("user_id", 0)
-        group_id = raw.get("group_id", 0)
+        inviter_id = int(raw.get("user_id") or 0)
+        group_id = int(raw.get("group_id") or 0)
 
-        inviter_info = await client.get_stranger_info(user_id=int(inviter_id)) or {}
-        group_info = await client.get_group_info(group_id=group_id)
+        # 资料只用于展示，接口失败时退回缓存值
+        inviter = await client.fetch("get_stranger_info", user_id=inviter_id)
+        group = await client.fetch("get_group_info", group_id=group_id)
+        inviter_info = inviter.value or {}
+        group_info = group.value or {}
 
         return cls(
             inviter_nickname=inviter_info.get("nickname") or "未知昵称",
-            inviter_id=str(inviter_id),
+            inviter_id=inviter_id,
             group_name=group_info.get("group_name") or "未知群名",
-            group_id=str(group_id),
+            group_id=group_id,
             flag=raw.get("flag", ""),
             comment=raw.get("comment") or "无",
         )
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from aiocqhttp.exceptions import ActionFailed
+
+from ..resilience import CircuitOpen
+
+# 协议端报错中的关键字 -> 错误类别
+_ERROR_HINTS = {
+    "not_member": ("不在群", "not in group", "群不存在", "group not found"),
+    "not_friend": ("不是好友", "非好友", "not friend", "陌生人"),
+}
+
+
+class RouteCache:
+    """
+    单个账号回复申请人的投递路线缓存
+
+    - 记住每个申请目标上次投递成功的路线，下次优先走它
+    - 记住某条路线对某个目标的确定性失败（如 bot 不在群里），在有效期内直接跳过
+    - 网络错误、超时、熔断属于临时故障，不记录
+    """
+
+    # 各错误类别的记忆时长（秒）
+    ERROR_TTL = {"not_member": 600.0, "not_friend": 600.0, "rejected": 120.0}
+
+    def __init__(self, ttl: float = 86400.0, capacity: int = 2048):
+        self.ttl = ttl
+        self.capacity = capacity
+        self._good: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bad: OrderedDict[tuple[str, int], tuple[float, str]] = OrderedDict()
+
+    @staticmethod
+    def classify(error: BaseException) -> str | None:
+        """确定性失败返回类别，临时故障返回 None"""
+        if isinstance(error, (asyncio.TimeoutError, CircuitOpen)):
+            return None
+        if not isinstance(error, ActionFailed):
+            return None
+        text = str(getattr(error, "result", "") or error).lower()
+        for kind, hints in _ERROR_HINTS.items():
+            if any(h in text for h in hints):
+                return kind
+        return "rejected"
+
+    def _put(self, table: OrderedDict, key, value) -> None:
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.capacity:
+            table.popitem(last=False)
+
+    def blocked(self, route: str, target: int) -> str | None:
+        """路线对该目标已知不可用时返回错误类别"""
+        hit = self._bad.get((route, target))
+        if hit is None:
+            return None
+        if hit[0] < time.monotonic():
+            del self._bad[(route, target)]
+            return None
+        return hit[1]
+
+    def order(self, key: str, routes: list[tuple[str, int]]) -> list[tuple[str, int]]:
+        """去掉已知不可用的路线，上次成功的路线排到最前"""
+        usable = [(r, t) for r, t in routes if not t or not self.blocked(r, t)]
+        hit = self._good.get(key)
+        if hit and hit[0] >= time.monotonic():
+            usable.sort(key=lambda rt: rt[0] != hit[1])
+        return usable
+
+    def succeeded(self, key: str, route: str) -> None:
+        self._put(self._good, key, (time.monotonic() + self.ttl, route))
+
+    def failed(self, route: str, target: int, error: BaseException) -> None:
+        kind = self.classify(error)
+        if kind is None or not target:
+            return
+        expires = time.monotonic() + self.ERROR_TTL[kind]
+        self._put(self._bad, (route, target), (expires, kind))
+
+    def mark(self, route: str, target: int, kind: str) -> None:
+        """已从其他途径得知路线不可用"""
+        expires = time.monotonic() + self.ERROR_TTL[kind]
+        self._put(self._bad, (route, target), (expires, kind))
@@ -0,0 +1,227 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from aiocqhttp.exceptions import ActionFailed
+
+from astrbot.api import logger
+
+from .deadline import call_timeout, timeouts
+from .tracing import KIND_CLIENT, Span, current_span
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """单个接口的重试策略"""
+
+    attempts: int = 1
+    base_delay: float = 0.3
+    max_delay: float = 2.0
+    cache: bool = False
+
+    def delay(self, attempt: int) -> float:
+        """带全抖动的指数退避"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+# 只读接口才允许重试和缓存；退群、发消息等有副作用的接口只调用一次
+POLICIES: dict[str, RetryPolicy] = {
+    "get_group_info": RetryPolicy(3, cache=True),
+    "get_stranger_info": RetryPolicy(3, cache=True),
+    "get_group_member_info": RetryPolicy(2, cache=True),
+    "get_group_member_list": RetryPolicy(3, base_delay=0.5, max_delay=4, cache=True),
+    "get_group_list": RetryPolicy(3, base_delay=0.5, max_delay=4, cache=True),
+    "get_friend_list": RetryPolicy(3, base_delay=0.5, max_delay=4, cache=True),
+    "get_group_msg_history": RetryPolicy(2),
+    "get_friend_msg_history": RetryPolicy(2),
+}
+DEFAULT_POLICY = RetryPolicy()
+# 超时小于该值的调用是被本地阶段预算截断的，超时不算协议端的失败
+MIN_SEND_TIMEOUT = 1.0
+
+
+class CircuitOpen(Exception):
+    """熔断中，直接失败"""
+
+
+class CircuitBreaker:
+    """
+    连续失败 threshold 次后熔断 cooldown 秒，期间调用直接失败；
+    冷却结束后放行一次试探调用，成功则恢复，失败则重新熔断
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.threshold:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """试探调用没有结果就结束（被取消、本地预算耗尽）时交还试探名额"""
+        self._probing = False
+
+    def success(self) -> None:
+        self.failures = 0
+        self._probing = False
+
+    def failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+@dataclass(slots=True)
+class Fetched:
+    """
+    查询结果
+    - stale: 接口失败，value 是之前缓存的值
+    - value 为 None 表示接口失败且没有缓存，调用方不应据此做决定
+    """
+
+    value: Any = None
+    stale: bool = False
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.value is not None and not self.stale
+
+
+class ResilientCaller:
+    """
+    单个账号的接口调用层：按接口重试、熔断、缓存最近一次成功结果
+
+    - ActionFailed 是协议端给出的明确答复（如群不存在），不重试也不计入熔断
+    - 网络错误、超时等才重试，重试耗尽计一次熔断失败
+    - 每次调用的超时取当前阶段剩余时间（见 deadline.py），重试不会越过截止时间
+    - 本地预算耗尽（请求没发出去，或超时被截断得太短）不计入熔断
+    """
+
+    def __init__(
+        self, threshold: int = 5, cooldown: float = 30.0, cache_size: int = 1024
+    ):
+        self.breaker = CircuitBreaker(threshold, cooldown)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, Any] = OrderedDict()
+
+    @staticmethod
+    def _key(action: str, params: dict[str, Any]) -> tuple:
+        return (action,) + tuple(
+            sorted((k, v) for k, v in params.items() if k != "no_cache")
+        )
+
+    def _remember(self, key: tuple, value: Any) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def call(
+        self,
+        send: Callable[..., Awaitable[Any]],
+        action: str,
+        params: dict[str, Any],
+    ) -> Any:
+        attrs = {"rpc.system": "onebot", "rpc.method": action}
+        with current_span().child(f"onebot/{action}", KIND_CLIENT, **attrs) as span:
+            return await self._call(send, action, params, span)
+
+    async def _call(
+        self,
+        send: Callable[..., Awaitable[Any]],
+        action: str,
+        params: dict[str, Any],
+        span: Span,
+    ) -> Any:
+        policy = POLICIES.get(action, DEFAULT_POLICY)
+        probe = self.breaker.state == "half-open"
+        if not self.breaker.allow():
+            raise CircuitOpen(f"接口熔断中，跳过 {action}")
+        try:
+            return await self._attempts(send, action, params, span, policy)
+        finally:
+            # 已经 success()/failure() 时这里无影响
+            if probe:
+                self.breaker.release()
+
+    async def _attempts(
+        self,
+        send: Callable[..., Awaitable[Any]],
+        action: str,
+        params: dict[str, Any],
+        span: Span,
+        policy: RetryPolicy,
+    ) -> Any:
+        for attempt in range(policy.attempts):
+            span.set(attempts=attempt + 1)
+            timeout = call_timeout()
+            if timeout <= 0:
+                # 请求还没发出去，是本地预算的问题
+                timeouts.call(action)
+                raise asyncio.TimeoutError(f"{action} 超时（阶段预算已用完）")
+            try:
+                result = await asyncio.wait_for(send(action, **params), timeout)
+            except ActionFailed:
+                self.breaker.success()
+                raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                if timed_out:
+                    timeouts.call(action)
+                delay = policy.delay(attempt)
+                # 重试次数或剩余时间用完
+                if attempt + 1 >= policy.attempts or delay >= call_timeout():
+                    # 给足了时间仍超时、或直接报错，才算协议端的失败
+                    if not timed_out or timeout >= MIN_SEND_TIMEOUT:
+                        self.breaker.failure()
+                    if timed_out:
+                        raise asyncio.TimeoutError(f"{action} 超时") from None
+                    raise
+                logger.debug(f"{action} 第{attempt + 1}次失败，重试: {e!r}")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.success()
+            if policy.cache:
+                self._remember(self._key(action, params), result)
+            return result
+
+    async def fetch(
+        self,
+        send: Callable[..., Awaitable[Any]],
+        action: str,
+        params: dict[str, Any],
+    ) -> Fetched:
+        """失败时退回缓存值并标记 stale，不抛异常"""
+        try:
+            return Fetched(await self.call(send, action, params))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"{action} 调用失败: {e}")
+            cached = self._cache.get(self._key(action, params))
+            return Fetched(cached, stale=cached is not None, error=str(e))
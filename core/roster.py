@@ -0,0 +1,307 @@
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiocqhttp import CQHttp
+
+from astrbot.api import logger
+
+
+@dataclass(slots=True)
+class RosterEntry:
+    """列表条目（群 / 好友）"""
+
+    ordinal: int  # 1-based 序号，与 退群/删好友 的序号一致
+    id: str
+    name: str
+    member_count: int = 0
+    raw: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def display(self) -> str:
+        if self.member_count:
+            return f"{self.ordinal}. {self.id}: {self.name}（{self.member_count}人）"
+        return f"{self.ordinal}. {self.id}: {self.name}"
+
+
+class NameIndex:
+    """
+    名称的字符 n-gram 倒排索引
+
+    - 单字查询走一元索引，其余走二元索引，候选取倒排表交集后再做子串校验
+    - 模糊查询按命中的二元组比例打分
+    - 支持按条目增删，列表变化时只更新变化的部分
+    """
+
+    def __init__(self):
+        self._texts: dict[str, str] = {}
+        self._postings: dict[str, set[str]] = {}
+
+    @staticmethod
+    def _grams(text: str) -> set[str]:
+        grams = set(text)
+        grams.update(text[i : i + 2] for i in range(len(text) - 1))
+        return grams
+
+    @staticmethod
+    def _query_grams(query: str) -> set[str]:
+        if len(query) < 2:
+            return {query}
+        return {query[i : i + 2] for i in range(len(query) - 1)}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, key: str, text: str) -> None:
+        text = text.lower()
+        if self._texts.get(key) == text:
+            return
+        self.remove(key)
+        self._texts[key] = text
+        for gram in self._grams(text):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            keys = self._postings.get(gram)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._postings[gram]
+
+    def substring(self, query: str) -> set[str]:
+        """名称包含 query 的条目"""
+        query = query.lower()
+        if not query:
+            return set()
+        postings = [self._postings.get(g) for g in self._query_grams(query)]
+        if not all(postings):
+            return set()
+        postings.sort(key=len)  # type: ignore[arg-type]
+        candidates = set(postings[0])  # type: ignore[arg-type]
+        for keys in postings[1:]:
+            candidates &= keys  # type: ignore[operator]
+            if not candidates:
+                return candidates
+        return {k for k in candidates if query in self._texts[k]}
+
+    def fuzzy(self, query: str, threshold: float = 0.5) -> list[str]:
+        """按二元组命中比例降序返回相似条目"""
+        query = query.lower()
+        grams = self._query_grams(query)
+        if not grams:
+            return []
+        hits: Counter[str] = Counter()
+        for gram in grams:
+            hits.update(self._postings.get(gram, ()))
+        need = len(grams) * threshold
+        scored = [(n, k) for k, n in hits.items() if n >= need]
+        scored.sort(key=lambda x: -x[0])
+        return [k for _, k in scored]
+
+
+class Roster(ABC):
+    """
+    群 / 好友列表缓存
+
+    - 列表在 ttl 内复用，过期或被 invalidate 后才重新拉取
+    - 拉取结果与上次一致时不重建索引，序号保持稳定
+    - 排序视图按需构建并缓存，列表变化时整体作废
+    """
+
+    kind: str = ""
+    sort_keys: dict[str, str] = {"名称": "name"}
+
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self.entries: list[RosterEntry] = []
+        self.by_id: dict[str, RosterEntry] = {}
+        self.index = NameIndex()
+        self.version = 0
+
+        self._signature: int | None = None
+        self._fetched_at = 0.0
+        self._stale = True
+        self._views: dict[str, list[RosterEntry]] = {}
+
+    # -------------------------
+    # 子类实现
+    # -------------------------
+    @abstractmethod
+    async def _fetch(self, client: CQHttp) -> list[dict]: ...
+
+    @abstractmethod
+    def _to_entry(self, ordinal: int, raw: dict) -> RosterEntry: ...
+
+    def _index_text(self, entry: RosterEntry) -> str:
+        """
+        参与名称检索的文本，不含 ID（按 ID 选取有单独的语法）
+        多个名称之间用换行分隔，查询词不含空白，不会跨名称匹配
+        """
+        return entry.name
+
+    # -------------------------
+    # 加载
+    # -------------------------
+    def invalidate(self) -> None:
+        """标记列表已变化，下次读取时重新拉取"""
+        self._stale = True
+
+    def is_fresh(self) -> bool:
+        return not self._stale and time.monotonic() - self._fetched_at < self.ttl
+
+    async def load(self, client: CQHttp, refresh: bool = False) -> list[RosterEntry]:
+        if refresh or not self.is_fresh():
+            raw_list = await self._fetch(client) or []
+            self._fetched_at = time.monotonic()
+            self._stale = False
+            self._rebuild(raw_list)
+        return self.entries
+
+    def _rebuild(self, raw_list: list[dict]) -> None:
+        entries = [self._to_entry(i + 1, raw) for i, raw in enumerate(raw_list)]
+        signature = hash(tuple((e.id, e.name, e.member_count) for e in entries))
+        if signature == self._signature:
+            return
+        self._signature = signature
+        by_id = {e.id: e for e in entries}
+        # 名称索引只增量更新变化的条目
+        for key in self.by_id.keys() - by_id.keys():
+            self.index.remove(key)
+        for e in entries:
+            self.index.add(e.id, self._index_text(e))
+        self.entries = entries
+        self.by_id = by_id
+        self._views.clear()
+        self.version += 1
+        logger.debug(f"[{self.kind}列表] 索引已重建，共 {len(entries)} 条")
+
+    # -------------------------
+    # 查询
+    # -------------------------
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, entry_id: str | int) -> RosterEntry | None:
+        return self.by_id.get(str(entry_id))
+
+    def at(self, index: int) -> RosterEntry:
+        """按 0-based 下标取条目"""
+        return self.entries[index]
+
+    def sorted_by(self, key: str = "") -> list[RosterEntry]:
+        """按名称 / 人数排序的视图（缓存）"""
+        if not key:
+            return self.entries
+        view = self._views.get(key)
+        if view is None:
+            if key == "member_count":
+                view = sorted(self.entries, key=lambda e: (-e.member_count, e.ordinal))
+            else:
+                view = sorted(self.entries, key=lambda e: (e.name, e.ordinal))
+            self._views[key] = view
+        return view
+
+    def search(self, keyword: str, key: str = "") -> list[RosterEntry]:
+        """名称 / ID 子串搜索，结果保持排序视图顺序"""
+        entries = self.sorted_by(key)
+        if not keyword:
+            return entries
+        keys = self.index.substring(keyword)
+        if keyword.isdigit():
+            # ID 不进名称索引，列表筛选时单独匹配
+            return [e for e in entries if e.id in keys or keyword in e.id]
+        return [e for e in entries if e.id in keys]
+
+    def match(self, query: str, fuzzy: bool = False) -> list[RosterEntry]:
+        """按名称选取条目，子串匹配按序号排序，模糊匹配按相似度排序"""
+        if fuzzy:
+            return [self.by_id[k] for k in self.index.fuzzy(query)]
+        keys = self.index.substring(query)
+        return sorted((self.by_id[k] for k in keys), key=lambda e: e.ordinal)
+
+    def sample(
+        self,
+        k: int = 1,
+        predicate: Callable[[RosterEntry], bool] | None = None,
+        tries: int = 8,
+    ) -> list[RosterEntry]:
+        """
+        随机抽 k 个不重复条目
+        带条件时先按下标随机拒绝采样（每次 O(1)），抽不够再退回线性筛选
+        """
+        entries = self.entries
+        if not entries or k <= 0:
+            return []
+        picked: dict[str, RosterEntry] = {}
+        for _ in range(k * tries):
+            if len(picked) >= k:
+                break
+            e = entries[random.randrange(len(entries))]
+            if predicate is None or predicate(e):
+                picked.setdefault(e.id, e)
+        if len(picked) < k:
+            pool = [
+                e
+                for e in entries
+                if e.id not in picked and (predicate is None or predicate(e))
+            ]
+            for e in random.sample(pool, min(k - len(picked), len(pool))):
+                picked[e.id] = e
+        return list(picked.values())
+
+    @staticmethod
+    def paginate(
+        entries: list[RosterEntry], page: int, size: int
+    ) -> tuple[list[RosterEntry], int, int]:
+        """返回 (当前页条目, 实际页码, 总页数)"""
+        size = max(size, 1)
+        pages = max((len(entries) + size - 1) // size, 1)
+        page = min(max(page, 1), pages)
+        start = (page - 1) * size
+        return entries[start : start + size], page, pages
+
+
+class GroupRoster(Roster):
+    kind = "群"
+    sort_keys = {"名称": "name", "人数": "member_count"}
+
+    async def _fetch(self, client: CQHttp) -> list[dict]:
+        return await client.get_group_list()
+
+    def _to_entry(self, ordinal: int, raw: dict) -> RosterEntry:
+        return RosterEntry(
+            ordinal=ordinal,
+            id=str(raw.get("group_id", "")),
+            name=raw.get("group_name") or "",
+            member_count=int(raw.get("member_count") or 0),
+            raw=raw,
+        )
+
+
+class FriendRoster(Roster):
+    kind = "好友"
+    sort_keys = {"名称": "name"}
+
+    async def _fetch(self, client: CQHttp) -> list[dict]:
+        return await client.get_friend_list()
+
+    def _to_entry(self, ordinal: int, raw: dict) -> RosterEntry:
+        return RosterEntry(
+            ordinal=ordinal,
+            id=str(raw.get("user_id", "")),
+            name=raw.get("remark") or raw.get("nickname") or "",
+            raw=raw,
+        )
+
+    def _index_text(self, entry: RosterEntry) -> str:
+        nickname = entry.raw.get("nickname") or ""
+        remark = entry.raw.get("remark") or ""
+        return f"{nickname}\n{remark}"
@@ -0,0 +1,226 @@
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+
+from astrbot.api import logger
+
+ACTIONS = ("同意", "拒绝", "拉黑")
+SCOPES = {"好友": "friend", "群邀请": "group"}
+
+# 条件位
+_WORD = 1
+_USER = 2
+_GROUP = 4
+
+
+@dataclass(slots=True)
+class Rule:
+    """
+    一条申请规则，配置写法：动作 [范围] 条件...
+    - 动作：同意 / 拒绝 / 拉黑
+    - 范围：好友 / 群邀请，不写则两者都适用
+    - 条件：词:关键词、QQ:号码或区间、群:群号或区间，如 QQ:10000-19999
+    同类条件之间为「或」，不同类条件之间为「且」
+    """
+
+    index: int
+    line: int
+    text: str
+    action: str
+    scope: str
+    required: int
+
+    def display(self) -> str:
+        return f"第{self.line}条「{self.text}」"
+
+
+class _Automaton:
+    """Aho-Corasick 自动机：一次扫描找出文本中出现的全部关键词"""
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[tuple[int, ...]] = [()]
+
+    def add(self, word: str, value: int) -> None:
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._out.append(())
+            state = nxt
+        self._out[state] += (value,)
+
+    def build(self) -> None:
+        """计算失败指针，并把后缀状态的输出合并进来"""
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] += self._out[self._fail[nxt]]
+
+    def scan(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+
+class _IntervalMap:
+    """ID 区间 → 规则，编译成互不重叠的基本区间，查询一次二分"""
+
+    def __init__(self, spans: list[tuple[int, int, int]]):
+        # 按位置排序的进入 / 离开事件扫一遍，每个边界处的生效规则即一个基本区间
+        events = sorted(
+            (pos, delta, r)
+            for lo, hi, r in spans
+            if lo < hi
+            for pos, delta in ((lo, 1), (hi, -1))
+        )
+        active: dict[int, int] = {}
+        self._bounds: list[int] = []
+        self._rules: list[frozenset[int]] = []
+        for i, (pos, delta, r) in enumerate(events):
+            count = active.get(r, 0) + delta
+            if count:
+                active[r] = count
+            else:
+                del active[r]
+            if i + 1 == len(events) or events[i + 1][0] != pos:
+                self._bounds.append(pos)
+                self._rules.append(frozenset(active))
+
+    def lookup(self, value: int) -> frozenset[int]:
+        i = bisect_right(self._bounds, value) - 1
+        return self._rules[i] if i >= 0 else frozenset()
+
+
+class RuleEngine:
+    """
+    申请规则引擎，配置加载时编译一次
+
+    - 全部关键词编进一个自动机，验证信息只扫描一遍，与规则数量无关
+    - QQ / 群号区间编成基本区间表，各一次二分
+    - 多条规则同时满足时取配置中靠前的一条
+    """
+
+    def __init__(self, lines: list[str]):
+        self.rules: list[Rule] = []
+        self._words = _Automaton()
+        user_spans: list[tuple[int, int, int]] = []
+        group_spans: list[tuple[int, int, int]] = []
+
+        for lineno, line in enumerate(lines, 1):
+            rule = self._compile(
+                str(line).strip(), len(self.rules), lineno, user_spans, group_spans
+            )
+            if rule:
+                self.rules.append(rule)
+
+        self._words.build()
+        self._users = _IntervalMap(user_spans)
+        self._groups = _IntervalMap(group_spans)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _compile(
+        self,
+        line: str,
+        index: int,
+        lineno: int,
+        user_spans: list[tuple[int, int, int]],
+        group_spans: list[tuple[int, int, int]],
+    ) -> Rule | None:
+        tokens = line.split()
+        if not tokens or tokens[0] not in ACTIONS:
+            if line:
+                logger.warning(f"申请规则「{line}」缺少动作（同意/拒绝/拉黑），已忽略")
+            return None
+        action, scope, required = tokens[0], "", 0
+        words: list[str] = []
+        spans: list[tuple[list, int, int]] = []
+
+        for token in tokens[1:]:
+            if token in SCOPES:
+                scope = SCOPES[token]
+                continue
+            key, sep, value = token.replace("：", ":").partition(":")
+            if not sep or not value:
+                logger.warning(f"申请规则「{line}」中的条件「{token}」无法识别，已忽略")
+                return None
+            if key == "词":
+                words.append(value.lower())
+                required |= _WORD
+                continue
+            if key not in ("QQ", "群"):
+                logger.warning(f"申请规则「{line}」中的条件「{token}」无法识别，已忽略")
+                return None
+            lo, _, hi = value.partition("-")
+            if not lo.isdigit() or (hi and not hi.isdigit()):
+                logger.warning(f"申请规则「{line}」中的区间「{value}」无效，已忽略")
+                return None
+            start, end = int(lo), int(hi or lo)
+            if end < start:
+                logger.warning(
+                    f"申请规则「{line}」中的区间「{value}」首尾颠倒，按 {end}-{start} 处理"
+                )
+                start, end = end, start
+            bit = _USER if key == "QQ" else _GROUP
+            target = user_spans if bit == _USER else group_spans
+            spans.append((target, start, end + 1))
+            required |= bit
+
+        if not required:
+            logger.warning(f"申请规则「{line}」没有任何条件，已忽略")
+            return None
+
+        for word in words:
+            self._words.add(word, index)
+        for target, lo, hi in spans:
+            target.append((lo, hi, index))
+        return Rule(index, lineno, line, action, scope, required)
+
+    def match(
+        self, kind: str, comment: str, user_id: int, group_id: int = 0
+    ) -> Rule | None:
+        """
+        返回命中的规则
+        :param kind: friend / group
+        """
+        if not self.rules:
+            return None
+        hits: dict[int, int] = {}
+        for r in self._words.scan(comment.lower()):
+            hits[r] = _WORD
+        if user_id:
+            for r in self._users.lookup(user_id):
+                hits[r] = hits.get(r, 0) | _USER
+        if group_id:
+            for r in self._groups.lookup(group_id):
+                hits[r] = hits.get(r, 0) | _GROUP
+
+        fired = None
+        for r, mask in hits.items():
+            rule = self.rules[r]
+            if mask != rule.required or (rule.scope and rule.scope != kind):
+                continue
+            if fired is None or r < fired.index:
+                fired = rule
+        return fired
@@ -0,0 +1,130 @@
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from astrbot.api import logger
+
+# 文件头：拍快照的时间
+_HEADER = struct.Struct("<d")
+
+
+@dataclass(slots=True)
+class RosterDiff:
+    """两次快照之间的变化"""
+
+    since: float  # 上一次快照的时间
+    added: list[int]
+    removed: list[int]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed)
+
+
+def merge_diff(old: Iterable[int], new: Iterable[int]) -> tuple[list[int], list[int]]:
+    """两个升序序列一遍归并，返回 (只在 new 中, 只在 old 中)"""
+    added: list[int] = []
+    removed: list[int] = []
+    old_it, new_it = iter(old), iter(new)
+    a = next(old_it, None)
+    b = next(new_it, None)
+    while a is not None and b is not None:
+        if a == b:
+            a = next(old_it, None)
+            b = next(new_it, None)
+        elif a < b:
+            removed.append(a)
+            a = next(old_it, None)
+        else:
+            added.append(b)
+            b = next(new_it, None)
+    if a is not None:
+        removed.append(a)
+        removed.extend(old_it)
+    if b is not None:
+        added.append(b)
+        added.extend(new_it)
+    return added, removed
+
+
+class SnapshotStore:
+    """
+    群 / 好友列表快照
+
+    - 每个账号每种列表一个文件：8 字节时间戳头 + 升序排列的 uint64 ID（小端）
+    - 新快照只是一个 array，旧快照按块流式读取，一遍归并得出增删
+    - 第一次拍快照时没有可比较的对象，不产生变化
+    """
+
+    def __init__(self, directory: Path, chunk: int = 4096):
+        self.dir = directory
+        self.chunk = chunk
+
+    def _path(self, self_id: str, kind: str) -> Path:
+        return self.dir / f"{self_id}-{kind}.snap"
+
+    def _read(self, path: Path) -> tuple[float, Iterator[int]] | None:
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            return None
+        head = f.read(_HEADER.size)
+        if len(head) < _HEADER.size:
+            f.close()
+            return None
+        (taken_at,) = _HEADER.unpack(head)
+
+        def ids() -> Iterator[int]:
+            with f:
+                while block := f.read(self.chunk * 8):
+                    arr = array("Q")
+                    arr.frombytes(block[: len(block) // 8 * 8])
+                    if sys.byteorder == "big":
+                        arr.byteswap()
+                    yield from arr
+
+        return taken_at, ids()
+
+    def _write(self, path: Path, ids: array) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        if sys.byteorder == "big":
+            ids = array("Q", ids)
+            ids.byteswap()
+        with tmp.open("wb") as f:
+            f.write(_HEADER.pack(time.time()))
+            ids.tofile(f)
+        tmp.replace(path)
+
+    def diff(self, self_id: str, kind: str, ids: Iterable[int]) -> RosterDiff | None:
+        """
+        ids 与上一份快照对比（不保存）
+        没有上一份快照（或读取失败）时返回 None
+        """
+        path = self._path(self_id, kind)
+        try:
+            old = self._read(path)
+            if old is not None:
+                since, old_ids = old
+                added, removed = merge_diff(old_ids, sorted(ids))
+                return RosterDiff(since, added, removed)
+        except Exception as e:
+            logger.warning(f"读取列表快照失败({path}): {e}")
+        return None
+
+    def save(self, self_id: str, kind: str, ids: Iterable[int]) -> None:
+        path = self._path(self_id, kind)
+        try:
+            self._write(path, array("Q", sorted(ids)))
+        except Exception as e:
+            logger.error(f"保存列表快照失败({path}): {e}")
+
+    def update(self, self_id: str, kind: str, ids: Iterable[int]) -> RosterDiff | None:
+        """以 ids 为新快照并与上一份对比，返回值同 diff"""
+        ids = sorted(ids)
+        diff = self.diff(self_id, kind, ids)
+        self.save(self_id, kind, ids)
+        return diff
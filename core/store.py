@@ -0,0 +1,442 @@
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
+from astrbot.api import logger
+
+from .config import ListSnapshot, PluginConfig
+
+# 表名 -> 中文名
+LIST_TABLES = {
+    "group_blacklist": "群聊黑名单",
+    "user_blacklist": "用户黑名单",
+    "manage_users": "审批员",
+    "mutual_blacklist": "互斥成员",
+}
+
+# 共享名单使用的 scope
+SHARED_SCOPE = ""
+
+# 等待其他进程释放锁的时间（毫秒）：写在后台线程里可以多等，读在事件循环里只等一小会
+WRITE_BUSY_TIMEOUT_MS = 5000
+READ_BUSY_TIMEOUT_MS = 200
+
+
+class SqliteStore:
+    """
+    名单 / 待审批申请的 SQLite 存储（WAL 模式）
+
+    - 每张名单表以 (scope, value) 为主键，scope 为空串表示全局共享，否则为账号 self_id
+    - 同一主机上多个 AstrBot 进程可安全共用一个库文件
+    - 写连接上的 data_version 用于发现其他进程的写入（本进程的写入都走这个连接，
+      不会改变它的值）
+    - 读写分两个连接：读在事件循环里（WAL 下读不会被写阻塞），
+      写全部交给单个后台线程按顺序执行，等锁不会卡住事件循环
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="relationship-db")
+        self._last_write: Future | None = None
+        self._wconn = self._connect(WRITE_BUSY_TIMEOUT_MS)
+        self._conn = self._connect(READ_BUSY_TIMEOUT_MS)
+        self._write(self._create_tables).result()
+
+    def _connect(self, busy_timeout: int) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        return conn
+
+    def _write(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """在写线程里执行 fn(*args)，失败只记日志"""
+
+        def run() -> Any:
+            try:
+                return fn(*args)
+            except Exception as e:
+                logger.error(f"写入名单数据库失败({fn.__name__}): {e}")
+                raise
+
+        self._last_write = self._writer.submit(run)
+        return self._last_write
+
+    def idle(self) -> bool:
+        """排队的写入都已完成（写线程按提交顺序执行，看最后一个即可）"""
+        return self._last_write is None or self._last_write.done()
+
+    def _transaction(self, statements: Iterable[tuple[str, Any]]) -> None:
+        """写线程内执行一组语句，一次提交；参数为序列的序列时走 executemany"""
+        self._wconn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                if isinstance(params, list):
+                    self._wconn.executemany(sql, params)
+                else:
+                    self._wconn.execute(sql, params)
+            self._wconn.execute("COMMIT")
+        except Exception:
+            self._wconn.execute("ROLLBACK")
+            raise
+
+    def _create_tables(self) -> None:
+        for table in LIST_TABLES:
+            self._wconn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "scope TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (scope, value)) WITHOUT ROWID"
+            )
+        self._wconn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_requests ("
+            "scope TEXT NOT NULL, flag TEXT NOT NULL, kind TEXT NOT NULL, "
+            "payload TEXT NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (scope, flag)) WITHOUT ROWID"
+        )
+        self._wconn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pending_created "
+            "ON pending_requests (created)"
+        )
+        self._wconn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def close(self) -> None:
+        # 先等排队的写入完成
+        self._writer.shutdown(wait=True)
+        self._wconn.close()
+        with self._lock:
+            self._conn.close()
+
+    def data_version(self) -> int:
+        """
+        其他进程写入后该值会变化（只读共享内存，不落盘）
+
+        data_version 只反映其他连接的提交：在读连接上取值时本进程自己的写入也会
+        让它变化，每次写入都会触发一次整体重载，所以改在写连接上取。
+        写连接归写线程所有，取值也排进写线程
+        """
+        return self._write(self._wconn_version).result()
+
+    def _wconn_version(self) -> int:
+        return self._wconn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    # -------------------------
+    # 名单
+    # -------------------------
+    def load(self, table: str, scope: str) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT value FROM {table} WHERE scope = ?", (scope,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def add(self, table: str, scope: str, values: Iterable[str]) -> Future:
+        # 批量写入只提交一次
+        rows = [(scope, v) for v in values]
+        sql = f"INSERT OR IGNORE INTO {table} (scope, value) VALUES (?, ?)"
+        return self._write(self._transaction, [(sql, rows)])
+
+    def remove(self, table: str, scope: str, values: Iterable[str]) -> Future:
+        rows = [(scope, v) for v in values]
+        sql = f"DELETE FROM {table} WHERE scope = ? AND value = ?"
+        return self._write(self._transaction, [(sql, rows)])
+
+    def seed_scope(self, scope: str, source: str) -> None:
+        """
+        首次使用 scope 时以 source 的名单为初始值
+        是否已初始化以 meta 中的标记为准，名单被清空后不会再被填回来
+        """
+        marker = f"seeded:{scope}"
+        if self._meta(marker) is not None:
+            return
+
+        def seed() -> None:
+            # 加标记之前就已有名单的 scope（旧版本初始化过）只补标记
+            used = any(
+                self._wconn.execute(
+                    f"SELECT 1 FROM {table} WHERE scope = ? LIMIT 1", (scope,)
+                ).fetchone()
+                for table in LIST_TABLES
+            )
+            statements = [
+                (
+                    f"INSERT OR IGNORE INTO {table} (scope, value) "
+                    f"SELECT ?, value FROM {table} WHERE scope = ?",
+                    (scope, source),
+                )
+                for table in LIST_TABLES
+                if table != "mutual_blacklist" and not used
+            ]
+            statements.append(
+                (
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    (marker, str(int(time.time()))),
+                )
+            )
+            self._transaction(statements)
+
+        # 一个账号只执行一次，之后马上要读，等它写完
+        self._write(seed).result()
+
+    # -------------------------
+    # 待审批申请
+    # -------------------------
+    def put_pending(self, scope: str, flag: str, kind: str, payload: str) -> None:
+        self._write(
+            self._wconn.execute,
+            "INSERT OR REPLACE INTO pending_requests "
+            "(scope, flag, kind, payload, created) VALUES (?, ?, ?, ?, ?)",
+            (scope, flag, kind, payload, time.time()),
+        )
+
+    def pop_pending(self, scope: str, flag: str) -> None:
+        self._write(
+            self._wconn.execute,
+            "DELETE FROM pending_requests WHERE scope = ? AND flag = ?",
+            (scope, flag),
+        )
+
+    def load_pending(self, scope: str) -> list[tuple[str, str, str]]:
+        """[(flag, kind, payload)]，按时间先后"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT flag, kind, payload FROM pending_requests "
+                "WHERE scope = ? ORDER BY created",
+                (scope,),
+            ).fetchall()
+
+    # -------------------------
+    # 与配置同步
+    # -------------------------
+    def mark_synced(self, table: str, values: Iterable[str]) -> Future:
+        """记下配置中该名单当前的内容，下次加载时据此找出 WebUI 里的改动"""
+        return self._write(
+            self._wconn.execute,
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (f"synced:{table}", json.dumps(sorted(values))),
+        )
+
+    def sync_from_config(self, cfg: PluginConfig) -> None:
+        """
+        加载时把配置中的全局名单同步进库（阻塞到写完）
+
+        - 第一次：整体导入
+        - 之后：与上次同步时的配置对比，只应用 WebUI 里新增 / 删除的条目，
+          不会覆盖其他进程或指令的写入
+        - 最后把库中的全局名单写回配置，WebUI 显示的就是实际生效的名单
+        """
+        changes: dict[str, tuple[set[str], set[str]]] = {}
+        for table in LIST_TABLES:
+            current = set(map(str, getattr(cfg, table)))
+            synced = self._meta(f"synced:{table}")
+            if synced is None:
+                # 从没同步过：新库整体导入；旧版本迁移过的库以库为准，从现在开始同步
+                if self._meta("migrated_from_config") is None:
+                    changes[table] = (current, set())
+                else:
+                    changes[table] = (set(), set())
+            else:
+                previous = set(json.loads(synced))
+                changes[table] = (current - previous, previous - current)
+
+        statements: list[tuple[str, Any]] = []
+        for table, (added, removed) in changes.items():
+            if added:
+                statements.append(
+                    (
+                        f"INSERT OR IGNORE INTO {table} (scope, value) VALUES (?, ?)",
+                        [(SHARED_SCOPE, v) for v in added],
+                    )
+                )
+            if removed:
+                statements.append(
+                    (
+                        f"DELETE FROM {table} WHERE scope = ? AND value = ?",
+                        [(SHARED_SCOPE, v) for v in removed],
+                    )
+                )
+        statements.append(
+            (
+                "INSERT OR IGNORE INTO meta (key, value) "
+                "VALUES ('migrated_from_config', ?)",
+                (str(int(time.time())),),
+            )
+        )
+        self._write(self._transaction, statements).result()
+
+        for table in LIST_TABLES:
+            values = self.load(table, SHARED_SCOPE)
+            cfg.replace_list(table, values, save=False)
+            self.mark_synced(table, values)
+        cfg.save_config()
+
+        summary = "，".join(
+            f"{LIST_TABLES[t]} +{len(a)}/-{len(r)}"
+            for t, (a, r) in changes.items()
+            if a or r
+        )
+        if summary:
+            logger.info(f"已将配置中的名单改动同步到 SQLite：{summary}")
+
+
+class StoreLists:
+    """
+    基于 SqliteStore 的名单，接口与 PluginConfig 的名单方法一致
+
+    名单以不可变快照常驻内存，判定不访问磁盘；写入先发布新快照，再交给写线程落库。
+    每隔 refresh_interval 秒检查一次 data_version，发现其他进程写入时整体重载。
+    全局名单变化时调用 on_change(表名, 新内容)，用于回写配置。
+    """
+
+    def __init__(
+        self,
+        store: SqliteStore,
+        scope: str,
+        admin_id: str | None = None,
+        refresh_interval: float = 5.0,
+        on_change: Callable[[str, frozenset[str]], None] | None = None,
+    ):
+        self.store = store
+        self.scope = scope
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self._lists = ListSnapshot()
+        self._version = -1
+        self._checked_at = 0.0
+        self._reload(notify=False)
+        if admin_id and admin_id not in self._lists.manage_users:
+            self._add("manage_users", admin_id)
+
+    def _scope(self, table: str) -> str:
+        # 互斥成员始终全局共享
+        return SHARED_SCOPE if table == "mutual_blacklist" else self.scope
+
+    def _reload(self, notify: bool = True) -> None:
+        self._version = self.store.data_version()
+        old = self._lists
+        self._lists = ListSnapshot(
+            **{t: frozenset(self.store.load(t, self._scope(t))) for t in LIST_TABLES}
+        )
+        self._checked_at = time.monotonic()
+        if notify:
+            for table in LIST_TABLES:
+                values = getattr(self._lists, table)
+                if values != getattr(old, table):
+                    self._changed(table, values)
+
+    def snapshot(self) -> ListSnapshot:
+        """当前名单快照，必要时先重载其他进程的写入"""
+        now = time.monotonic()
+        # 自己还有写入在排队时不重载，免得读到落库前的旧数据
+        if now - self._checked_at > self.refresh_interval and self.store.idle():
+            self._checked_at = now
+            if self.store.data_version() != self._version:
+                self._reload()
+        return self._lists
+
+    def _fresh(self, table: str) -> frozenset[str]:
+        return getattr(self.snapshot(), table)
+
+    def _changed(self, table: str, values: frozenset[str]) -> None:
+        if self.on_change and self._scope(table) == SHARED_SCOPE:
+            self.on_change(table, values)
+
+    def _publish(self, table: str, values: frozenset[str]) -> None:
+        self._lists = replace(self._lists, **{table: values})
+        self._changed(table, values)
+
+    def _add(self, table: str, value: str | int) -> None:
+        v = str(value)
+        current = self._fresh(table)
+        if v in current:
+            return
+        self._publish(table, current | {v})
+        self.store.add(table, self._scope(table), [v])
+        logger.info(f"{v} 已加入{LIST_TABLES[table]}")
+
+    def _add_many(self, table: str, values: Iterable[str | int]) -> int:
+        current = self._fresh(table)
+        new = [v for v in dict.fromkeys(map(str, values)) if v not in current]
+        if new:
+            self._publish(table, current.union(new))
+            self.store.add(table, self._scope(table), new)
+            logger.info(f"{len(new)} 个 ID 已加入{LIST_TABLES[table]}")
+        return len(new)
+
+    def _remove(self, table: str, value: str | int) -> None:
+        v = str(value)
+        current = self._fresh(table)
+        if v not in current:
+            return
+        self._publish(table, current - {v})
+        self.store.remove(table, self._scope(table), [v])
+        logger.info(f"{v} 已从{LIST_TABLES[table]}移除")
+
+    # 列表视图（只读）
+    @property
+    def group_blacklist(self) -> list[str]:
+        return sorted(self._fresh("group_blacklist"))
+
+    @property
+    def user_blacklist(self) -> list[str]:
+        return sorted(self._fresh("user_blacklist"))
+
+    @property
+    def manage_users(self) -> list[str]:
+        return sorted(self._fresh("manage_users"))
+
+    @property
+    def mutual_blacklist(self) -> list[str]:
+        return sorted(self._fresh("mutual_blacklist"))
+
+    def is_black_group(self, group_id: str | int) -> bool:
+        return self.snapshot().is_black_group(group_id)
+
+    def add_black_group(self, group_id: str | int) -> None:
+        self._add("group_blacklist", group_id)
+
+    def add_black_groups(self, group_ids: Iterable[str | int]) -> int:
+        return self._add_many("group_blacklist", group_ids)
+
+    def remove_black_group(self, group_id: str | int) -> None:
+        self._remove("group_blacklist", group_id)
+
+    def is_block_user(self, user_id: str | int) -> bool:
+        return self.snapshot().is_block_user(user_id)
+
+    def add_block_user(self, user_id: str | int) -> None:
+        self._add("user_blacklist", user_id)
+
+    def add_block_users(self, user_ids: Iterable[str | int]) -> int:
+        return self._add_many("user_blacklist", user_ids)
+
+    def remove_block_user(self, user_id: str | int) -> None:
+        self._remove("user_blacklist", user_id)
+
+    def is_manage_user(self, user_id: str | int) -> bool:
+        return self.snapshot().is_manage_user(user_id)
+
+    def add_manage_user(self, user_id: str | int) -> None:
+        self._add("manage_users", user_id)
+
+    def remove_manage_user(self, user_id: str | int) -> None:
+        self._remove("manage_users", user_id)
+
+    def is_mutual(self, user_id: str | int) -> bool:
+        return self.snapshot().is_mutual(user_id)
@@ -0,0 +1,339 @@
+import asyncio
+from collections.abc import Iterable
+
+from aiocqhttp.exceptions import ActionFailed
+
+from astrbot.api import logger
+
+from .bot import BotContext, BotRegistry
+from .config import ListSnapshot, PluginConfig
+from .forward import ForwardTool
+from .journal import JournalRecord
+from .roster import RosterEntry
+from .snapshot import SnapshotStore
+from .utils import RateLimiter
+
+# 汇报里最多列出几个 ID
+LIST_LIMIT = 10
+# 能解释群为何出现 / 消失的日志动作
+JOIN_ACTIONS = ("入群", "同意群邀请")
+LEAVE_ACTIONS = ("退群", "被踢出群", "群解散")
+# 群列表比上一份快照少了超过该比例时视为列表不完整（协议端刚重连等），本轮不对比
+MAX_SHRINK = 0.5
+
+
+class ComplianceSweep:
+    """
+    已加入群聊的定期合规巡检
+
+    - 黑名单、群人数这类规则只依赖群列表，每轮对全部群检查
+    - 互斥成员需要拉取群成员列表，只对上次巡检后人数变化或收到过成员变动通知的群复查
+    - 成员列表请求受并发数和速率双重限制
+    - 每轮只汇报新出现的违规，汇总成一条消息发给管理员
+    - 每轮给群 / 好友列表拍快照，与上一轮对比，找出没有经过通知或插件操作的变化
+    """
+
+    def __init__(self, config: PluginConfig, bots: BotRegistry):
+        self.cfg = config
+        self.scfg = config.sweep
+        self.bots = bots
+        self.snapshots = SnapshotStore(bots.data_dir / "snapshots")
+        self._task: asyncio.Task | None = None
+
+    # -------------------------
+    # 后台任务
+    # -------------------------
+    def start(self) -> None:
+        if self.scfg.enable and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self) -> None:
+        interval = max(self.scfg.interval, 1) * 60
+        while True:
+            await asyncio.sleep(interval)
+            for bot in list(self.bots):
+                try:
+                    digest = await self.sweep(bot)
+                    if digest:
+                        await ForwardTool.send_admin(bot.client, self.cfg, digest)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception(f"[{bot.self_id}] 群聊巡检失败")
+
+    # -------------------------
+    # 单轮巡检
+    # -------------------------
+    async def sweep(
+        self, bot: BotContext, full: bool = False, report_all: bool = False
+    ) -> str:
+        """
+        巡检一个账号的全部群聊，返回汇总文本（无可汇报内容时为空）
+        :param full: 忽略增量状态，复查所有群的成员
+        :param report_all: 汇报全部违规，而不只是新出现的
+        """
+        await bot.groups.load(bot.client, refresh=True)
+        entries = list(bot.groups.entries)
+        changes, joined = await self._roster_changes(bot, entries)
+
+        lists = bot.lists.snapshot()
+        mutual = lists.mutual_blacklist - {bot.self_id}
+        # 互斥名单变化后需要全量复查成员
+        if mutual != bot.sweep_mutual:
+            full = True
+            bot.sweep_mutual = mutual
+
+        limiter = RateLimiter(self.scfg.rate, burst=self.scfg.concurrency)
+        sem = asyncio.Semaphore(max(self.scfg.concurrency, 1))
+
+        async def check(entry: RosterEntry) -> tuple[RosterEntry, str]:
+            reason = self._check_static(lists, entry)
+            if reason or not mutual:
+                return entry, reason
+            changed = (
+                full
+                or entry.id in bot.dirty_groups
+                or bot.sweep_counts.get(entry.id) != entry.member_count
+            )
+            if not changed:
+                return entry, bot.sweep_violations.get(entry.id, "")
+            async with sem:
+                await limiter.acquire()
+                reason = await self._check_members(bot, entry, mutual)
+            if reason is None:
+                # 拉取失败，保持原状态，下轮重试
+                return entry, bot.sweep_violations.get(entry.id, "")
+            bot.sweep_counts[entry.id] = entry.member_count
+            bot.dirty_groups.discard(entry.id)
+            return entry, reason
+
+        results = await asyncio.gather(*(check(e) for e in entries))
+
+        violations = {e.id: reason for e, reason in results if reason}
+        new = [
+            (e, violations[e.id])
+            for e, _ in results
+            if e.id in violations
+            and (report_all or bot.sweep_violations.get(e.id) != violations[e.id])
+        ]
+        bot.sweep_violations = violations
+        # 已不在的群不再追踪
+        alive = {e.id for e in entries}
+        for gid in list(bot.sweep_counts):
+            if gid not in alive:
+                del bot.sweep_counts[gid]
+
+        lines: list[str] = list(changes)
+        max_cap = self.cfg.notice.max_group_capacity
+        if max_cap and len(entries) > max_cap:
+            lines.append(f"当前已加 {len(entries)} 个群，超过容量 {max_cap}")
+            # 新出现的群没有经过入群时的容量检查，超出部分按入群检查的做法退掉，
+            # 按入群时间从晚到早（列表接口不保证顺序）
+            if self.scfg.auto_leave and joined:
+                excess = sorted(
+                    (e for e in entries if e.id in joined and e.id not in violations),
+                    key=lambda e: (joined[e.id], e.ordinal),
+                )[-(len(entries) - max_cap) :]
+                for entry in excess:
+                    reason = f"超过群容量 {max_cap}"
+                    result = await self._leave(bot, entry, reason)
+                    lines.append(f"{entry.name}({entry.id})：{reason}{result}")
+
+        for entry, reason in new:
+            line = f"{entry.name}({entry.id})：{reason}"
+            if self.scfg.auto_leave:
+                line += await self._leave(bot, entry, reason)
+            lines.append(line)
+
+        if not lines:
+            return ""
+        head = f"【群聊巡检】共 {len(entries)} 个群，违规 {len(violations)} 个"
+        if len(violations) > len(new):
+            head += f"（其中 {len(violations) - len(new)} 个此前已报告）"
+        return head + "\n" + "\n".join(lines)
+
+    # -------------------------
+    # 列表快照
+    # -------------------------
+    @staticmethod
+    def _brief(ids: list[str]) -> str:
+        text = "、".join(ids[:LIST_LIMIT])
+        return text + (f" 等 {len(ids)} 个" if len(ids) > LIST_LIMIT else "")
+
+    @staticmethod
+    async def _journal(
+        bot: BotContext, ids: Iterable[str], actions: tuple[str, ...], since: float
+    ) -> dict[str, list[JournalRecord]]:
+        """快照之后这些 ID 的相关日志（一次扫描，在线程里读文件）"""
+        found = await asyncio.to_thread(
+            bot.journal.find, set(ids), since=since, actions=actions
+        )
+        return {
+            target: mine
+            for target, records in found.items()
+            if (mine := [r for r in records if r.bot == bot.self_id])
+        }
+
+    async def _unexplained(
+        self, bot: BotContext, ids: list[int], actions: tuple[str, ...], since: float
+    ) -> list[str]:
+        """快照之后没有对应日志的 ID（即插件没做过、也没收到过通知）"""
+        targets = [str(i) for i in ids]
+        explained = await self._journal(bot, targets, actions, since)
+        return [t for t in targets if t not in explained]
+
+    @staticmethod
+    async def _still_in(bot: BotContext, gids: list[str]) -> set[str]:
+        """群列表里没有、但还能查到自己群成员资料的群（列表不完整）"""
+        present: set[str] = set()
+        for gid in gids:
+            try:
+                info = await bot.client.get_group_member_info(
+                    group_id=int(gid), user_id=int(bot.self_id), no_cache=True
+                )
+            except ActionFailed:
+                continue
+            except Exception as e:
+                # 查询失败时不确定，按还在群里处理，下轮再看
+                logger.debug(f"[{bot.self_id}] 查询群({gid})成员资料失败: {e}")
+                present.add(gid)
+                continue
+            if info:
+                present.add(gid)
+        return present
+
+    @staticmethod
+    async def _disbanded(bot: BotContext, gids: list[str]) -> set[str]:
+        """已解散的群：查不到群资料或人数为 0（接口异常时按未解散处理）"""
+        disbanded: set[str] = set()
+        for gid in gids:
+            try:
+                info = await bot.client.get_group_info(group_id=int(gid), no_cache=True)
+            except ActionFailed:
+                disbanded.add(gid)
+                continue
+            except Exception as e:
+                logger.debug(f"[{bot.self_id}] 查询群({gid})资料失败: {e}")
+                continue
+            if not (info or {}).get("member_count"):
+                disbanded.add(gid)
+        return disbanded
+
+    async def _roster_changes(
+        self, bot: BotContext, entries: list[RosterEntry]
+    ) -> tuple[list[str], dict[str, float]]:
+        """对比上一份快照，返回 (汇报行, 新出现的群号 -> 入群时间)"""
+        lines: list[str] = []
+        joined: dict[str, float] = {}
+
+        ids = sorted(int(e.id) for e in entries if e.id.isdigit())
+        diff = self.snapshots.diff(bot.self_id, "groups", ids)
+        # 第一次拍快照时列表为空多半是没拿到，不存
+        keep = diff is not None or bool(ids)
+        shrunk = False
+        if diff and diff.removed:
+            before = len(ids) - len(diff.added) + len(diff.removed)
+            shrunk = len(diff.removed) > before * MAX_SHRINK
+        if shrunk and not bot.sweep_shrunk:
+            # 列表为空或骤减多半是协议端没拿全，保留旧快照，下轮仍是这样才采信
+            logger.warning(
+                f"[{bot.self_id}] 群列表由 {before} 个降到 {len(ids)} 个，"
+                "本轮不对比，下轮确认"
+            )
+            diff = None
+            keep = False
+        bot.sweep_shrunk = shrunk and diff is None
+
+        if diff:
+            added = [str(g) for g in diff.added]
+            # 入群时间取日志里的入群 / 同意邀请记录，查不到的按上一份快照的时间算
+            # （视为最早，容量超出时优先退掉确知是新加的群）
+            joins = await self._journal(bot, added, JOIN_ACTIONS, diff.since)
+            joined = {
+                gid: max((r.ts for r in joins.get(gid, ())), default=diff.since)
+                for gid in added
+            }
+            # 新群在本轮复查互斥成员
+            bot.dirty_groups.update(joined)
+            if joined:
+                lines.append(f"新加入 {len(joined)} 个群：{self._brief(sorted(joined))}")
+            left = await self._unexplained(bot, diff.removed, LEAVE_ACTIONS, diff.since)
+            # 逐个确认：还能查到自己的群成员资料说明只是列表漏了，留在快照里
+            present = await self._still_in(bot, left)
+            if present:
+                left = [g for g in left if g not in present]
+                ids = sorted(ids + [int(g) for g in present])
+            if left:
+                line = f"已不在 {len(left)} 个群（非本插件退出）：{self._brief(left)}"
+                # 视同被踢；已解散的群不拉黑
+                if self.cfg.notice.kick_block_group:
+                    disbanded = await self._disbanded(bot, left)
+                    kicked = [g for g in left if g not in disbanded]
+                    added_count = bot.lists.add_black_groups(kicked)
+                    for gid in kicked:
+                        bot.record("拉黑群", gid, operator="sweep", reason="被移出群聊")
+                    line += f"，已拉黑 {added_count} 个"
+                    if disbanded:
+                        line += f"（{len(disbanded)} 个已解散，未拉黑）"
+                lines.append(line)
+        if keep:
+            self.snapshots.save(bot.self_id, "groups", ids)
+
+        try:
+            friends = await bot.friends.load(bot.client, refresh=True)
+        except Exception as e:
+            logger.warning(f"[{bot.self_id}] 巡检获取好友列表失败: {e}")
+            return lines, joined
+        ids = (int(e.id) for e in friends if e.id.isdigit())
+        diff = self.snapshots.update(bot.self_id, "friends", ids)
+        if diff:
+            gone = await self._unexplained(bot, diff.removed, ("删好友",), diff.since)
+            if gone:
+                lines.append(
+                    f"{len(gone)} 个好友已不在列表（非本插件删除）：{self._brief(gone)}"
+                )
+            if diff.added:
+                lines.append(f"新增 {len(diff.added)} 个好友")
+        return lines, joined
+
+    def _check_static(self, lists: ListSnapshot, entry: RosterEntry) -> str:
+        """只依赖群列表的规则"""
+        ncfg = self.cfg.notice
+        if lists.is_black_group(entry.id):
+            return "黑名单群聊"
+        count = entry.member_count
+        if ncfg.block_small_group and count and count <= ncfg.min_group_size:
+            return f"群人数 {count} ≤ {ncfg.min_group_size}"
+        if ncfg.max_group_size and count > ncfg.max_group_size:
+            return f"群人数 {count} > {ncfg.max_group_size}"
+        return ""
+
+    async def _check_members(
+        self, bot: BotContext, entry: RosterEntry, mutual: frozenset[str]
+    ) -> str | None:
+        """返回违规原因，无违规为空串，拉取失败为 None"""
+        try:
+            members = await bot.client.get_group_member_list(group_id=int(entry.id))
+        except Exception as e:
+            logger.warning(f"[{bot.self_id}] 巡检获取群({entry.id})成员失败: {e}")
+            return None
+        common = mutual.intersection(str(m["user_id"]) for m in members or [])
+        if common:
+            return f"存在互斥成员 {min(common)}"
+        return ""
+
+    async def _leave(self, bot: BotContext, entry: RosterEntry, reason: str) -> str:
+        try:
+            await bot.client.set_group_leave(group_id=int(entry.id))
+        except Exception as e:
+            outcome = f"失败: {e}"
+            bot.record("退群", entry.id, operator="sweep", reason=reason, outcome=outcome)
+            return "，退群失败"
+        bot.record("退群", entry.id, operator="sweep", reason=reason)
+        bot.groups.invalidate()
+        return "，已退群"
@@ -0,0 +1,228 @@
+import json
+import os
+import random
+import time
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any
+
+from astrbot.api import logger
+
+# OpenTelemetry 的 SpanKind / StatusCode 取值
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current: ContextVar["Span | None"] = ContextVar("relationship_span", default=None)
+
+
+def current_span() -> "Span":
+    """当前任务所在的 span，未采样时为空 span"""
+    return _current.get() or NOOP_SPAN
+
+
+def _attr(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Span:
+    """
+    一个计时区间，结束时交给 Tracer 导出
+    可作为上下文管理器使用，异常会记为 ERROR 状态
+    """
+
+    __slots__ = (
+        "tracer",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start",
+        "attrs",
+        "status",
+        "message",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer | None",
+        trace_id: str,
+        parent_id: str,
+        name: str,
+        kind: int = KIND_INTERNAL,
+        attrs: dict[str, Any] | None = None,
+    ):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.attrs = attrs or {}
+        self.status = STATUS_OK
+        self.message = ""
+        self._token = None
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attrs: Any) -> "Span":
+        return Span(self.tracer, self.trace_id, self.span_id, name, kind, attrs)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def fail(self, error: BaseException | str) -> None:
+        self.status = STATUS_ERROR
+        self.message = str(error) or type(error).__name__
+
+    def activate(self) -> "Token | None":
+        """设为当前 span，返回的令牌交给 deactivate 还原"""
+        return _current.set(self)
+
+    def deactivate(self, token: "Token | None") -> None:
+        """还原 activate 之前的 span"""
+        if token is not None:
+            _current.reset(token)
+
+    def end(self) -> None:
+        if self.tracer:
+            self.tracer.export(self, time.time_ns())
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.fail(exc)
+        _current.reset(self._token)
+        self.end()
+
+    def to_json(self, end: int) -> str:
+        data: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(end),
+            "attributes": [_attr(k, v) for k, v in self.attrs.items()],
+            "status": {"code": self.status},
+        }
+        if self.message:
+            data["status"]["message"] = self.message
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class _NoopSpan(Span):
+    """未采样时的占位 span，所有操作都不做事"""
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(None, "", "", "")
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, **attrs: Any) -> Span:
+        return self
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def fail(self, error: BaseException | str) -> None:
+        pass
+
+    def activate(self) -> "Token | None":
+        return None
+
+    def deactivate(self, token: "Token | None") -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> Span:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    def __bool__(self) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    事件级追踪：每个采样到的事件一个 trace id，阶段和接口调用各一个 span
+
+    - 每行一个 span，字段沿用 OTLP/JSON 的 Span 结构（服务名见 SERVICE）
+    - 文件超过 max_bytes 时滚动为 .1 ... .backups
+    - rate 为 0 时 start() 直接返回空 span，不产生任何开销
+    """
+
+    SERVICE = "astrbot_plugin_relationship"
+
+    def __init__(
+        self,
+        out_dir: Path,
+        rate: float = 0.0,
+        max_bytes: int = 8 * 1024 * 1024,
+        backups: int = 3,
+        flush_every: int = 64,
+    ):
+        self.path = out_dir / "traces.jsonl"
+        self.rate = min(max(rate, 0.0), 1.0)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_every = flush_every
+        self._buffer: list[str] = []
+
+    def start(self, name: str, **attrs: Any) -> Span:
+        """开始一个事件的根 span，未被采样时返回空 span"""
+        if not self.rate or random.random() >= self.rate:
+            return NOOP_SPAN
+        attrs.setdefault("service.name", self.SERVICE)
+        return Span(self, os.urandom(16).hex(), "", name, KIND_SERVER, attrs)
+
+    def export(self, span: Span, end: int) -> None:
+        self._buffer.append(span.to_json(end))
+        # 根 span 结束时整条 trace 已齐，顺便落盘
+        if not span.parent_id or len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                self._rotate()
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except Exception as e:
+            logger.warning(f"写入追踪数据失败: {e}")
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+    def close(self) -> None:
+        self.flush()
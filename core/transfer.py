@@ -0,0 +1,249 @@
+import asyncio
+import csv
+import json
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from astrbot.api import logger
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from .bot import BotContext, BotRegistry
+from .config import PluginConfig
+from .request.model import GroupRequest
+
+# 导出内容 -> 文件名
+EXPORT_KINDS = {
+    "好友": "friends",
+    "群": "groups",
+    "群黑名单": "group_blacklist",
+    "用户黑名单": "user_blacklist",
+    "待审批": "pending",
+    "日志": "journal",
+}
+# 导出格式 -> 扩展名
+FORMATS = {"csv": ".csv", "json": ".ndjson"}
+# 各导出内容的表头
+COLUMNS = {
+    "好友": ["user_id", "nickname", "remark"],
+    "群": ["group_id", "group_name", "member_count", "max_member_count"],
+    "群黑名单": ["group_id"],
+    "用户黑名单": ["user_id"],
+    "待审批": ["flag", "type", "requester_id", "group_id", "comment"],
+    "日志": ["time", "bot", "action", "target", "operator", "reason", "outcome"],
+}
+# 导入时识别的 ID 字段（按优先级）
+ID_FIELDS = ("group_id", "user_id", "id")
+
+
+class TransferHandle:
+    """
+    列表 / 名单 / 日志的文件导出与导入（文件放在插件数据目录 transfer/ 下）
+
+    - 导出在后台线程逐行写入，不在内存里拼整个文件；写完先尝试上传，失败则返回路径
+    - 导入逐行解析，所有 ID 收集完后一次性批量写入名单（只保存一次）
+    """
+
+    def __init__(self, config: PluginConfig, bots: BotRegistry):
+        self.cfg = config
+        self.bots = bots
+        self.dir = bots.data_dir / "transfer"
+
+    # -------------------------
+    # 导出
+    # -------------------------
+    async def _rows(self, bot: BotContext, kind: str) -> Iterable[tuple]:
+        """逐行生成器；只读快照，可放到线程里消费"""
+        match kind:
+            case "好友":
+                entries = await bot.friends.load(bot.client, refresh=True)
+                return (
+                    (e.id, e.raw.get("nickname") or "", e.raw.get("remark") or "")
+                    for e in entries
+                )
+            case "群":
+                entries = await bot.groups.load(bot.client, refresh=True)
+                return (
+                    (e.id, e.name, e.member_count, e.raw.get("max_member_count") or 0)
+                    for e in entries
+                )
+            case "群黑名单":
+                return ((v,) for v in list(bot.lists.group_blacklist))
+            case "用户黑名单":
+                return ((v,) for v in list(bot.lists.user_blacklist))
+            case "待审批":
+                pending = list(bot.pending.items())
+                return (
+                    (
+                        flag,
+                        "group" if isinstance(req, GroupRequest) else "friend",
+                        req.requester_id,
+                        req.group_id if isinstance(req, GroupRequest) else "",
+                        getattr(req, "comment", ""),
+                    )
+                    for flag, req in pending
+                )
+            case _:
+                return (
+                    (
+                        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r.ts)),
+                        r.bot,
+                        r.action,
+                        r.target,
+                        r.operator,
+                        r.reason,
+                        r.outcome,
+                    )
+                    for r in self.bots.journal.iter_records()
+                )
+
+    @staticmethod
+    def _write(path: Path, fmt: str, columns: list[str], rows: Iterable[tuple]) -> int:
+        """逐行写入临时文件后改名，返回行数"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        count = 0
+        # csv 带 BOM，方便直接用表格软件打开
+        encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+        with tmp.open("w", encoding=encoding, newline="") as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            else:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    f.write("\n")
+                    count += 1
+        tmp.replace(path)
+        return count
+
+    async def _deliver(
+        self, event: AiocqhttpMessageEvent, bot: BotContext, path: Path
+    ) -> bool:
+        """把文件发到当前会话，协议端不支持或失败时返回 False"""
+        try:
+            if gid := event.get_group_id():
+                await bot.client.upload_group_file(
+                    group_id=int(gid), file=str(path), name=path.name
+                )
+            else:
+                await bot.client.upload_private_file(
+                    user_id=int(event.get_sender_id()), file=str(path), name=path.name
+                )
+            return True
+        except Exception as e:
+            logger.warning(f"上传导出文件失败: {e}")
+            return False
+
+    async def export(self, event: AiocqhttpMessageEvent):
+        """导出 <好友|群|群黑名单|用户黑名单|待审批|日志> [csv|json]"""
+        args = event.message_str.split()[1:]
+        kind = next((a for a in args if a in EXPORT_KINDS), "")
+        if not kind:
+            yield event.plain_result(f"用法：导出 <{'|'.join(EXPORT_KINDS)}> [csv|json]")
+            return
+        fmt = next((a.lower() for a in args if a.lower() in FORMATS), "csv")
+        bot = self.bots.get(event)
+
+        rows = await self._rows(bot, kind)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = self.dir / f"{EXPORT_KINDS[kind]}-{bot.self_id}-{stamp}{FORMATS[fmt]}"
+        try:
+            count = await asyncio.to_thread(self._write, path, fmt, COLUMNS[kind], rows)
+        except Exception as e:
+            logger.error(f"导出{kind}失败: {e}")
+            yield event.plain_result(f"导出{kind}失败：{e}")
+            return
+
+        text = f"已导出{kind} {count} 条"
+        if not await self._deliver(event, bot, path):
+            text += f"，文件位置：{path}"
+        yield event.plain_result(text)
+
+    # -------------------------
+    # 导入
+    # -------------------------
+    @staticmethod
+    def _read_ids(path: Path) -> Iterator[str]:
+        """
+        逐行读出 ID
+        - csv：按表头里的 ID 字段取列，没有表头时取第一列
+        - ndjson：每行一个对象取 ID 字段，也接受每行一个纯数字
+        """
+        with path.open(encoding="utf-8-sig", newline="") as f:
+            if path.suffix == ".csv":
+                col = 0
+                for i, row in enumerate(csv.reader(f)):
+                    if not row:
+                        continue
+                    if i == 0 and not row[0].strip().isdigit():
+                        col = next((row.index(k) for k in ID_FIELDS if k in row), 0)
+                        continue
+                    if col < len(row) and (value := row[col].strip()).isdigit():
+                        yield value
+                return
+            for line in f:
+                line = line.strip()
+                if line.isdigit():
+                    yield line
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(obj, dict):
+                    value = str(next((obj[k] for k in ID_FIELDS if k in obj), ""))
+                    if value.isdigit():
+                        yield value
+
+    def _resolve(self, name: str) -> Path | None:
+        """只允许读取 transfer/ 目录下的文件"""
+        path = (self.dir / name).resolve()
+        if path.parent != self.dir.resolve() or not path.is_file():
+            return None
+        return path
+
+    async def import_list(self, event: AiocqhttpMessageEvent):
+        """导入 <群黑名单|用户黑名单> <文件名>"""
+        args = event.message_str.split()[1:]
+        kind = next((a for a in args if a in ("群黑名单", "用户黑名单")), "")
+        name = next((a for a in args if a != kind), "")
+        if not kind or not name:
+            yield event.plain_result(
+                f"用法：导入 <群黑名单|用户黑名单> <文件名>\n文件需放在 {self.dir} 下"
+            )
+            return
+        path = self._resolve(name)
+        if path is None:
+            yield event.plain_result(f"找不到文件：{self.dir / name}")
+            return
+
+        bot = self.bots.get(event)
+        try:
+            # 去重后的全部 ID；解析放到线程里，不阻塞事件循环
+            ids = await asyncio.to_thread(
+                lambda: list(dict.fromkeys(self._read_ids(path)))
+            )
+        except Exception as e:
+            logger.error(f"读取导入文件失败: {e}")
+            yield event.plain_result(f"读取文件失败：{e}")
+            return
+
+        if kind == "群黑名单":
+            added = bot.lists.add_black_groups(ids)
+        else:
+            added = bot.lists.add_block_users(ids)
+        bot.record(
+            f"导入{kind}",
+            path.name,
+            operator=event.get_sender_id(),
+            reason=f"文件 {len(ids)} 条，新增 {added} 条",
+        )
+        yield event.plain_result(
+            f"从 {path.name} 读到 {len(ids)} 个 ID，{kind}新增 {added} 个"
+        )
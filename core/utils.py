@@ -1,5 +1,9 @@
 
+import asyncio
 import re
+import time
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
 
 from aiocqhttp import CQHttp
 
@@ -9,6 +13,30 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 )
 
 
+class RateLimiter:
+    """令牌桶限速：每秒补充 rate 个令牌，最多攒 burst 个"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = max(rate, 0.01)
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
 def convert_duration_advanced(duration: int) -> str:
     """
     将秒数转换为更友好的时长字符串，如“1天2小时3分钟4秒”
@@ -111,7 +139,75 @@ def get_ats(
     return list(ats)
 
 
-def parse_multi_input(raw: str, total: int) -> tuple[set[int], set[str]]:
+NAME_PREFIXES = ("名:", "名：", "名~")
+
+
+def parse_name_terms(raw: str) -> tuple[str, list[tuple[str, bool]]]:
+    """
+    从文本参数中拆出按名称选取的条件：
+    - 名:关键词 / 名：关键词  子串匹配
+    - 名~关键词              模糊匹配
+
+    返回：
+        rest:  去掉名称条件后的文本
+        terms: [(关键词, 是否模糊)]
+    """
+    rest: list[str] = []
+    terms: list[tuple[str, bool]] = []
+    for token in raw.split():
+        if token.startswith(NAME_PREFIXES) and len(token) > 2:
+            terms.append((token[2:], token[1] == "~"))
+        else:
+            rest.append(token)
+    return " ".join(rest), terms
+
+
+class IntervalSet:
+    """
+    0-based 索引的区间集合（半开区间，已排序、已合并）
+
+    迭代是惰性的，大区间不会一次性展开
+    """
+
+    __slots__ = ("spans",)
+
+    def __init__(self, spans: Iterable[tuple[int, int]] = ()):
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(s for s in spans if s[0] < s[1]):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        self.spans: tuple[tuple[int, int], ...] = tuple(merged)
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.spans:
+            yield from range(start, end)
+
+    def __len__(self) -> int:
+        return sum(end - start for start, end in self.spans)
+
+    def __bool__(self) -> bool:
+        return bool(self.spans)
+
+    def __contains__(self, index: object) -> bool:
+        if not isinstance(index, int):
+            return False
+        pos = bisect_right(self.spans, (index, float("inf"))) - 1
+        return pos >= 0 and index < self.spans[pos][1]
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({list(self.spans)!r})"
+
+    def first(self) -> int | None:
+        return self.spans[0][0] if self.spans else None
+
+
+_RANGE_RE = re.compile(r"(\d+)\s*[~-]\s*(\d+)")
+
+
+def parse_multi_input(raw: str, total: int) -> tuple[IntervalSet, set[str]]:
     """
     解析文本参数，支持：
     - 空格分隔
@@ -120,38 +216,32 @@ def parse_multi_input(raw: str, total: int) -> tuple[set[int], set[str]]:
     - 直接 ID（QQ / 群号）
 
     返回：
-        indexes: 0-based 索引集合
+        indexes: 0-based 索引区间集合（已裁剪到 total 以内，可惰性迭代）
         ids:     明确 ID 集合
     """
-    indexes: set[int] = set()
+    spans: list[tuple[int, int]] = []
     ids: set[str] = set()
 
     if not raw:
-        return indexes, ids
-
-    for token in raw.strip().split():
-        token = token.strip()
-        if not token:
-            continue
+        return IntervalSet(), ids
 
+    for token in raw.split():
         # 区间
-        m = re.fullmatch(r"(\d+)\s*[~-]\s*(\d+)", token)
+        m = _RANGE_RE.fullmatch(token)
         if m:
             start, end = int(m.group(1)), int(m.group(2))
             if start > end:
                 start, end = end, start
-            for i in range(start, end + 1):
-                if 1 <= i <= total:
-                    indexes.add(i - 1)
+            # 1-based 闭区间 -> 0-based 半开区间，并裁剪到 [0, total)
+            spans.append((max(start, 1) - 1, min(end, total)))
             continue
 
         # 单数字
         if token.isdigit():
             num = int(token)
             if 1 <= num <= total:
-                indexes.add(num - 1)
+                spans.append((num - 1, num))
             else:
                 ids.add(token)
 
-    return indexes, ids
-
+    return IntervalSet(spans), ids
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiocqhttp import CQHttp
+
+from astrbot.api import logger
+from astrbot.api.star import Context
+
+from .bot import BotContext, BotRegistry
+from .config import PluginConfig
+from .utils import RateLimiter
+
+# 预热时的并发数和每秒调用数
+CONCURRENCY = 4
+RATE = 5.0
+# 加载后最多等多久客户端就绪（秒）及探测间隔
+DISCOVER_WINDOW = 300
+DISCOVER_INTERVAL = 5
+
+
+class Warmup:
+    """
+    插件加载后的后台预热，插件注册不等待任何接口
+
+    - 找到 aiocqhttp 客户端并拿到登录号后开始预热；之后首次出现的账号同样预热
+    - 预热内容：群列表、好友列表、所有群的群资料、审批员和管理员的资料
+    - 并发数和速率受限；接口熔断时放弃剩余部分，不和正常请求抢
+    - 结果写进日志，并可在「关系状态」里查看
+    """
+
+    def __init__(self, context: Context, config: PluginConfig, bots: BotRegistry):
+        self.context = context
+        self.cfg = config
+        self.bots = bots
+        self._tasks: set[asyncio.Task] = set()
+
+    # -------------------------
+    # 后台任务
+    # -------------------------
+    def start(self) -> None:
+        self.bots.on_create = self.schedule
+        self._spawn(self._discover())
+
+    def stop(self) -> None:
+        self.bots.on_create = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def _spawn(self, coro: Awaitable[Any]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def schedule(self, bot: BotContext) -> None:
+        """新账号上下文创建时调用"""
+        bot.warmup = "进行中"
+        self._spawn(self._warm(bot))
+
+    # -------------------------
+    # 找客户端
+    # -------------------------
+    def _clients(self) -> list[CQHttp]:
+        clients = []
+        try:
+            for platform in self.context.platform_manager.get_insts():
+                if platform.meta().name == "aiocqhttp":
+                    clients.append(platform.get_client())
+        except Exception as e:
+            logger.debug(f"获取平台实例失败: {e}")
+        return clients
+
+    async def _discover(self) -> None:
+        """等客户端连上协议端，以登录号创建账号上下文（由 on_create 触发预热）"""
+        give_up = time.monotonic() + DISCOVER_WINDOW
+        while time.monotonic() < give_up:
+            found = False
+            for client in self._clients():
+                try:
+                    info = await asyncio.wait_for(client.get_login_info(), 10)
+                except Exception:
+                    # 尚未连接，或一个客户端挂了多个账号（等各账号的事件再预热）
+                    continue
+                if user_id := (info or {}).get("user_id"):
+                    self.bots.get_by_id(str(user_id), client)
+                    found = True
+            if found or len(self.bots):
+                return
+            await asyncio.sleep(DISCOVER_INTERVAL)
+        logger.info("未找到可用的 aiocqhttp 客户端，跳过预热")
+
+    # -------------------------
+    # 预热
+    # -------------------------
+    async def _warm(self, bot: BotContext) -> None:
+        started = time.monotonic()
+        limiter = RateLimiter(RATE, burst=CONCURRENCY)
+        sem = asyncio.Semaphore(CONCURRENCY)
+        stats: Counter[str] = Counter()
+
+        async def limited(kind: str, make: Callable[[], Awaitable[Any]]) -> None:
+            if bot.calls.breaker.state != "closed":
+                stats["跳过"] += 1
+                return
+            async with sem:
+                await limiter.acquire()
+                try:
+                    await make()
+                    stats[kind] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    stats["失败"] += 1
+                    logger.debug(f"[{bot.self_id}] 预热 {kind} 失败: {e}")
+
+        client = bot.client
+        try:
+            # 1. 列表
+            await asyncio.gather(
+                limited("群列表", lambda: bot.groups.load(client, refresh=True)),
+                limited("好友列表", lambda: bot.friends.load(client, refresh=True)),
+            )
+            # 2. 群资料（不超过接口缓存的一半，免得挤掉其他缓存）
+            gids = [int(e.id) for e in bot.groups.entries if e.id.isdigit()]
+            gids = gids[: bot.calls.cache_size // 2]
+            # 3. 审批员和管理员资料
+            uids = {*bot.lists.manage_users, *self.cfg.admins_id}
+            await asyncio.gather(
+                *(
+                    limited("群资料", lambda g=g: client.get_group_info(group_id=g))
+                    for g in gids
+                ),
+                *(
+                    limited(
+                        "用户资料", lambda u=u: client.get_stranger_info(user_id=int(u))
+                    )
+                    for u in uids
+                    if str(u).isdigit()
+                ),
+            )
+        except asyncio.CancelledError:
+            bot.warmup = "已取消"
+            raise
+
+        elapsed = time.monotonic() - started
+        detail = "，".join(f"{k} {n}" for k, n in stats.items()) or "无"
+        bot.warmup = f"完成，用时 {elapsed:.1f} 秒（{detail}）"
+        logger.info(f"[{bot.self_id}] 缓存预热{bot.warmup}")
@@ -1,5 +1,5 @@
 from astrbot.api.event import filter
-from astrbot.api.star import Context, Star
+from astrbot.api.star import Context, Star, StarTools
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
@@ -7,49 +7,70 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 from astrbot.core.star.filter.permission import PermissionType
 from astrbot.core.star.filter.platform_adapter_type import PlatformAdapterType
 
+from .core.bot import BotRegistry
+from .core.capability import capabilities
 from .core.config import PluginConfig
 from .core.contact import ContactHandle
 from .core.forward import ForwardTool
 from .core.normal import NormalHandle
 from .core.notice import NoticeHandle
+from .core.profiler import SamplingProfiler
 from .core.request import RequestHandle
+from .core.sweep import ComplianceSweep
+from .core.transfer import TransferHandle
 from .core.utils import get_ats, get_nickname
+from .core.warmup import Warmup
 
 
 class RelationshipPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
         self.cfg = PluginConfig(config, context)
-        self.normal = NormalHandle(self.cfg)
-        self.request = RequestHandle(self.cfg)
-        self.notice = NoticeHandle(self.cfg)
-        self.contact = ContactHandle(self.cfg)
+        self.data_dir = StarTools.get_data_dir("astrbot_plugin_relationship")
+        self.bots = BotRegistry(self.cfg, self.data_dir)
+        self.normal = NormalHandle(self.cfg, self.bots)
+        self.request = RequestHandle(self.cfg, self.bots)
+        self.notice = NoticeHandle(self.cfg, self.bots)
+        self.contact = ContactHandle(self.cfg, self.bots)
+        self.sweep = ComplianceSweep(self.cfg, self.bots)
+        self.transfer = TransferHandle(self.cfg, self.bots)
+        self.profiler = SamplingProfiler(self.data_dir / "profile")
+        self.warmup = Warmup(context, self.cfg, self.bots)
+        self.bots.journal.start()
+        self.sweep.start()
+        self.warmup.start()
+
+    async def terminate(self):
+        self.sweep.stop()
+        self.warmup.stop()
+        self.request.close()
+        self.bots.close()
 
     @filter.permission_type(PermissionType.ADMIN)
     @filter.command("群列表")
     async def get_group_list(self, event: AiocqhttpMessageEvent):
-        """查看bot加入的所有群聊信息"""
+        """群列表 [人数|名称] [关键词] [页码]"""
         async for msg in self.normal.get_group_list(event):
             yield msg
 
     @filter.permission_type(PermissionType.ADMIN)
     @filter.command("好友列表")
     async def get_friend_list(self, event: AiocqhttpMessageEvent):
-        """查看bot的所有好友信息"""
+        """好友列表 [名称] [关键词] [页码]"""
         async for msg in self.normal.get_friend_list(event):
             yield msg
 
     @filter.permission_type(PermissionType.ADMIN)
     @filter.command("退群")
     async def set_group_leave(self, event: AiocqhttpMessageEvent):
-        """退群 <序号|群号|区间> [可批量]"""
+        """退群 <序号|群号|区间|名:群名> [可批量]"""
         async for msg in self.normal.set_group_leave(event):
             yield msg
 
     @filter.permission_type(PermissionType.ADMIN)
     @filter.command("删好友", alias={"删除好友"})
     async def delete_friend(self, event: AiocqhttpMessageEvent):
-        """删好友 <@昵称|QQ|序号|区间> [可批量]"""
+        """删好友 <@昵称|QQ|序号|区间|名:昵称> [可批量]"""
         async for msg in self.normal.delete_friend(event):
             yield msg
 
@@ -67,6 +88,66 @@ class RelationshipPlugin(Star):
         async for msg in self.normal.remove_manage_user(event):
             yield msg
 
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("关系日志")
+    async def query_journal(self, event: AiocqhttpMessageEvent):
+        """关系日志 [群号|QQ] [条数]"""
+        async for msg in self.normal.query_journal(event):
+            yield msg
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("导出")
+    async def export_data(self, event: AiocqhttpMessageEvent):
+        """导出 <好友|群|群黑名单|用户黑名单|待审批|日志> [csv|json]"""
+        async for msg in self.transfer.export(event):
+            yield msg
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("导入")
+    async def import_list(self, event: AiocqhttpMessageEvent):
+        """导入 <群黑名单|用户黑名单> <文件名>"""
+        async for msg in self.transfer.import_list(event):
+            yield msg
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("活跃度")
+    async def get_activity(self, event: AiocqhttpMessageEvent):
+        """活跃度 [条数]，查看最活跃和沉寂的群"""
+        async for msg in self.normal.get_activity(event):
+            yield msg
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("关系状态")
+    async def get_status(self, event: AiocqhttpMessageEvent):
+        """查看接口熔断状态、预热进度和各阶段超时次数"""
+        async for msg in self.normal.get_status(event):
+            yield msg
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("性能剖析")
+    async def profile(self, event: AiocqhttpMessageEvent, seconds: int = 30):
+        """性能剖析 [秒数]，采样插件协程并输出耗时最多的函数"""
+        seconds = min(max(seconds, 1), 300)
+        if not self.profiler.running:
+            yield event.plain_result(f"开始剖析，{seconds} 秒后出结果")
+        yield event.plain_result(await self.profiler.run(seconds))
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("巡检")
+    async def sweep_groups(self, event: AiocqhttpMessageEvent):
+        """按当前规则检查所有已加入的群"""
+        bot = self.bots.get(event)
+        digest = await self.sweep.sweep(bot, full=True, report_all=True)
+        yield event.plain_result(digest or "巡检完成，没有发现违规群")
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("重载模块")
+    async def reload_capabilities(self, event: AiocqhttpMessageEvent):
+        """重新探测可选模块（afdian、expansion）"""
+        status = capabilities.reload()
+        lines = [f"{name}：{'可用' if ok else '不可用'}" for name, ok in status.items()]
+        yield event.plain_result("\n".join(lines))
+
     @filter.platform_adapter_type(PlatformAdapterType.AIOCQHTTP)
     @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
     async def on_notice(self, event: AiocqhttpMessageEvent):
@@ -107,29 +188,29 @@ class RelationshipPlugin(Star):
     async def check_messages(
         self,
         event: AiocqhttpMessageEvent,
-        group_id: int | None = None,
+        target: str | None = None,
         count: int | None = None,
     ):
-        """抽查 <群号|@群友|@QQ> <数量>, 抽查聊天记录"""
+        """抽查 <群号|序号|名:群名|@群友|@QQ> <数量>, 抽查聊天记录"""
         count = count or self.cfg.check.count
         async for msg in ForwardTool.check_messages(
             event,
-            target_id=group_id,
+            bot=self.bots.get(event),
+            target_id=target,
             count=count,
         ):
             yield msg
 
     @filter.command("推荐")
     async def on_contact(self, event: AiocqhttpMessageEvent):
-        """推荐 <群号/@群友/@qq>"""
+        """推荐 <群号/@群友/@qq> 或 推荐 <群|好友> [数量]"""
         await self.contact.contact(event)
 
     @filter.command("加好友")
     async def add_group(self, event: AiocqhttpMessageEvent):
         """加好友 [QQ号/@某人] [验证消息] [备注] [答案]"""
-        try:
-            from .core.expansion import ExpansionHandle
-        except ImportError:
+        ExpansionHandle = capabilities.get("expansion")
+        if ExpansionHandle is None:
             # yield event.plain_result("该功能仅对开发人员开放")
             return
         parts = event.message_str.strip().split()
@@ -152,7 +233,7 @@ class RelationshipPlugin(Star):
         verify = args[0] if args else ""
         remark = args[1] if len(args) > 1 else ""
         answer = args[2] if len(args) > 2 else ""
-        client = event.bot
+        client = self.bots.get(event).client
         self_id = int(event.get_self_id())
         if not verify:
             gid = event.get_group_id()
@@ -174,9 +255,8 @@ class RelationshipPlugin(Star):
     @filter.command("加群")
     async def add_friend(self, event: AiocqhttpMessageEvent):
         """加群 [群号] [答案]"""
-        try:
-            from .core.expansion import ExpansionHandle
-        except ImportError:
+        ExpansionHandle = capabilities.get("expansion")
+        if ExpansionHandle is None:
             # yield event.plain_result("该功能仅对开发人员开放")
             return
         parts = event.message_str.strip().split()
@@ -190,7 +270,7 @@ class RelationshipPlugin(Star):
             yield event.plain_result("群号格式错误")
             return
         answer = args[1] if len(args) > 1 else None
-        client = event.bot
+        client = self.bots.get(event).client
         self_id = int(event.get_self_id())
         if not answer:
             gid = event.get_group_id()
@@ -0,0 +1,11 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+# 插件运行时作为包被 AstrBot 加载（core 里有相对插件根目录的导入），
+# 测试时同样把插件目录注册成包 relationship，按 relationship.core.xxx 导入
+_ROOT = Path(__file__).resolve().parents[1]
+_spec = importlib.util.spec_from_file_location(
+    "relationship", _ROOT / "__init__.py", submodule_search_locations=[str(_ROOT)]
+)
+sys.modules["relationship"] = importlib.util.module_from_spec(_spec)
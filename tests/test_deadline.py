@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from relationship.core.deadline import (  # noqa: E402
+    DEFAULT_CALL_TIMEOUT,
+    Deadline,
+    DeadlineExceeded,
+    TimeoutStats,
+    call_timeout,
+)
+
+
+def test_call_timeout_restored_after_stage():
+    async def main():
+        deadline = Deadline("t", 5, TimeoutStats())
+
+        async def inside():
+            return call_timeout()
+
+        seen = await deadline.run("stage", inside(), 1)
+        assert 0 < seen <= 1
+        assert call_timeout() == DEFAULT_CALL_TIMEOUT
+
+    asyncio.run(main())
+
+
+def test_call_timeout_restored_after_stage_timeout():
+    async def main():
+        stats = TimeoutStats()
+        deadline = Deadline("t", 5, stats)
+        with pytest.raises(DeadlineExceeded):
+            await deadline.run("slow", asyncio.sleep(10), 0.05)
+        assert call_timeout() == DEFAULT_CALL_TIMEOUT
+        assert stats.stages["t.slow"] == 1
+
+    asyncio.run(main())
+
+
+def test_nested_stage_restores_outer_budget():
+    async def main():
+        outer = Deadline("outer", 5, TimeoutStats())
+        inner = Deadline("inner", 5, TimeoutStats())
+
+        async def body():
+            await inner.run("short", asyncio.sleep(0), 0.1)
+            return call_timeout()
+
+        after_inner = await outer.run("long", body(), 3)
+        assert 0.1 < after_inner <= 3
+
+    asyncio.run(main())
+
+
+def test_stage_span_not_left_current():
+    from relationship.core.tracing import NOOP_SPAN, Span, current_span
+
+    async def main():
+        root = Span(None, "0" * 32, "", "root")
+        deadline = Deadline("t", 5, TimeoutStats(), trace=root)
+
+        async def inside():
+            return current_span()
+
+        seen = await deadline.run("stage", inside(), 1)
+        assert seen.parent_id == root.span_id
+        assert current_span() is NOOP_SPAN
+
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("astrbot")
+
+from relationship.core.notice.handle import _GroupQueue  # noqa: E402
+
+
+def queue_with(*kinds: str) -> _GroupQueue:
+    queue = _GroupQueue()
+    for seq, kind in enumerate(kinds, 1):
+        queue.mark(kind, seq)
+    return queue
+
+
+def test_invite_after_kick_keeps_kick():
+    queue = queue_with("decrease", "increase")
+    assert not queue.superseded("decrease", 1)
+    assert not queue.superseded("increase", 2)
+
+
+def test_kick_after_invite_replaces_invite():
+    queue = queue_with("increase", "decrease")
+    assert queue.superseded("increase", 1)
+    assert not queue.superseded("decrease", 2)
+
+
+def test_membership_change_drops_stale_ban_and_admin():
+    queue = queue_with("ban", "admin", "increase")
+    assert queue.superseded("ban", 1)
+    assert queue.superseded("admin", 2)
+
+
+def test_same_kind_coalesces():
+    queue = queue_with("ban", "ban", "admin")
+    assert queue.superseded("ban", 1)
+    assert not queue.superseded("ban", 2)
+    assert not queue.superseded("admin", 3)
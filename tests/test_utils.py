@@ -0,0 +1,93 @@
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from relationship.core.utils import IntervalSet, parse_multi_input  # noqa: E402
+
+
+class TestIntervalSet:
+    def test_merges_overlapping_and_adjacent(self):
+        s = IntervalSet([(5, 8), (0, 2), (2, 4), (7, 10)])
+        assert s.spans == ((0, 4), (5, 10))
+
+    def test_nested_span_absorbed(self):
+        assert IntervalSet([(0, 10), (3, 5)]).spans == ((0, 10),)
+
+    def test_empty_and_reversed_spans_dropped(self):
+        s = IntervalSet([(3, 3), (5, 2)])
+        assert not s
+        assert len(s) == 0
+        assert s.first() is None
+        assert list(s) == []
+
+    def test_len_iter_first(self):
+        s = IntervalSet([(4, 6), (0, 2)])
+        assert len(s) == 4
+        assert list(s) == [0, 1, 4, 5]
+        assert s.first() == 0
+
+    def test_contains_boundaries(self):
+        s = IntervalSet([(2, 4), (6, 7)])
+        assert [i for i in range(9) if i in s] == [2, 3, 6]
+        assert -1 not in s
+        assert "2" not in s
+
+    def test_large_span_is_lazy(self):
+        s = IntervalSet([(0, 10**12)])
+        assert len(s) == 10**12
+        it = iter(s)
+        assert [next(it), next(it)] == [0, 1]
+        assert 10**12 - 1 in s and 10**12 not in s
+
+
+class TestParseMultiInput:
+    def test_empty(self):
+        indexes, ids = parse_multi_input("", 10)
+        assert not indexes and ids == set()
+
+    def test_indexes_are_zero_based(self):
+        indexes, ids = parse_multi_input("1 3", 10)
+        assert list(indexes) == [0, 2]
+        assert ids == set()
+
+    def test_ranges_merged_and_clipped(self):
+        indexes, _ = parse_multi_input("2-4 3~6 8-100", 10)
+        assert indexes.spans == ((1, 6), (7, 10))
+
+    def test_reversed_range(self):
+        indexes, _ = parse_multi_input("5-2", 10)
+        assert list(indexes) == [1, 2, 3, 4]
+
+    def test_range_outside_total_is_empty(self):
+        indexes, _ = parse_multi_input("20-30", 10)
+        assert not indexes
+
+    def test_zero_start_clipped(self):
+        indexes, _ = parse_multi_input("0-2", 10)
+        assert list(indexes) == [0, 1]
+
+    def test_numbers_out_of_range_are_ids(self):
+        indexes, ids = parse_multi_input("2 0 11 123456", 10)
+        assert list(indexes) == [1]
+        assert ids == {"0", "11", "123456"}
+
+    def test_non_numeric_tokens_ignored(self):
+        indexes, ids = parse_multi_input("abc 1", 10)
+        assert list(indexes) == [0]
+        assert ids == set()
+
+    def test_huge_range_is_constant_time_and_memory(self):
+        # 最坏输入：整个区间按序号展开会是 1 亿个元素，这里只存一个区间
+        tracemalloc.start()
+        start = time.perf_counter()
+        indexes, _ = parse_multi_input("1-99999999", 99999999)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(indexes) == 99999999
+        assert indexes.spans == ((0, 99999999),)
+        assert elapsed < 0.05
+        assert peak < 64 * 1024